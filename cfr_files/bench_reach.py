@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+import time
+import argparse
+from stub import (
+    Cfr,
+    TreeIndex,
+    RegretMatching,
+    load_game,
+    compute_opponent_reach,
+    compute_utility_vector_pl1,
+    compute_utility_vector_pl2,
+)
+
+
+def iterations_per_sec(game, iters, use_index):
+    """
+    Time the CFR loop of solve_problem_3_2 with either the per-infoset
+    compute_opponent_reach walk (before) or one TreeIndex pass (after).
+    """
+    tfsdp1, tfsdp2 = game["decision_problem_pl1"], game["decision_problem_pl2"]
+    c1 = Cfr(tfsdp1, rm_class=RegretMatching)
+    c2 = Cfr(tfsdp2, rm_class=RegretMatching)
+    idx1, idx2 = TreeIndex(tfsdp1), TreeIndex(tfsdp2)
+    dec1 = [n for n in tfsdp1 if n["type"] == "decision"]
+    dec2 = [n for n in tfsdp2 if n["type"] == "decision"]
+
+    start = time.perf_counter()
+    for _ in range(iters):
+        x = c1.next_strategy()
+        y = c2.next_strategy()
+        u1 = compute_utility_vector_pl1(game, y)
+        u2 = compute_utility_vector_pl2(game, x)
+        if use_index:
+            reach1 = idx1.opponent_reach(y)
+            reach2 = idx2.opponent_reach(x)
+        else:
+            reach1 = {n["id"]: compute_opponent_reach(tfsdp1, y, n["id"]) for n in dec1}
+            reach2 = {n["id"]: compute_opponent_reach(tfsdp2, x, n["id"]) for n in dec2}
+        for c, dec, u, reach in ((c1, dec1, u1, reach1), (c2, dec2, u2, reach2)):
+            for n in dec:
+                I = n["id"]
+                c.local[I].observe_utility({a: reach[I] * u[(I, a)] for a in n["actions"]})
+    return iters / (time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Reach computation: per-infoset walk vs TreeIndex")
+    p.add_argument("--games", nargs="+",
+                   default=["games/kuhn_poker.json", "games/leduc_poker.json"])
+    p.add_argument("--iters", type=int, default=200)
+    p.add_argument("--compiled", action="store_true",
+                   help="compute utility vectors with the integer-indexed sparse game")
+    args = p.parse_args()
+
+    for path in args.games:
+        game = load_game(path, compiled=args.compiled)
+        before = iterations_per_sec(game, args.iters, use_index=False)
+        after = iterations_per_sec(game, args.iters, use_index=True)
+        print(f"{path:<32} before {before:9.1f} it/s   after {after:9.1f} it/s   ({after/before:.1f}x)")
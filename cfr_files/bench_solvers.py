@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+import json
+import time
+import argparse
+from stub import load_game
+from vector_cfr import solve, gap
+from cfr_train import ALGORITHMS, make_algorithm
+
+SCHEDULES = ["simultaneous", "alternating"]
+
+
+def iterations_to_gap(cg, minimizer, alternating, target, max_iters):
+    """
+    Run vector_cfr.solve until the average strategies' saddle-point gap is
+    at most `target`. Returns (iterations, gap, seconds); iterations is None
+    if the target was not reached within max_iters.
+    """
+    result = {"iterations": None, "gap": float("inf"), "total": 0.0}
+
+    def check(t, cfr1, cfr2, cum1, cum2):
+        result["total"] += cfr1.average_weight(t)
+        g = gap(cg, cum1 / result["total"], cum2 / result["total"])
+        result["gap"] = g
+        if g <= target:
+            result["iterations"] = t
+            return True
+
+    start = time.perf_counter()
+    solve(cg, max_iters, minimizer=minimizer, alternating=alternating, callback=check)
+    return result["iterations"], result["gap"], time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Iterations to reach a saddle-point gap, per solver variant")
+    p.add_argument("--games", nargs="+",
+                   default=["games/kuhn_poker.json", "games/leduc_poker.json",
+                            "games/liarsdice_5die_1bid.json"])
+    p.add_argument("--target", type=float, default=1e-3, help="saddle-point gap to reach")
+    p.add_argument("--max-iters", type=int, default=20000)
+    p.add_argument("--alpha", type=float, default=1.5)
+    p.add_argument("--beta", type=float, default=0.0)
+    p.add_argument("--gamma", type=float, default=2.0)
+    p.add_argument("--out", help="also write the results as JSON lines")
+    args = p.parse_args()
+
+    rows = []
+    for path in args.games:
+        cg = load_game(path, compiled=True)["compiled"]
+        for algorithm in ALGORITHMS:
+            _, minimizer = make_algorithm(algorithm, args.alpha, args.beta, args.gamma)
+            for schedule in SCHEDULES:
+                iters, g, secs = iterations_to_gap(cg, minimizer, schedule == "alternating",
+                                                   args.target, args.max_iters)
+                rows.append({"game": path, "algorithm": algorithm, "schedule": schedule,
+                             "target": args.target, "iterations": iters, "gap": g, "seconds": secs})
+                shown = iters if iters is not None else f">{args.max_iters}"
+                print(f"{path:<32} {algorithm:<5} {schedule:<12} {shown:>8} iters  "
+                      f"gap {g:.2e}  {secs:7.2f} s")
+    if args.out:
+        with open(args.out, "w") as f:
+            for r in rows:
+                f.write(json.dumps(r) + "\n")
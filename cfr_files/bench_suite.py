@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark every solver path on the bundled games and append one JSON line
+per (solver, engine, game) run: iterations/sec, peak RSS, iterations and
+seconds until the saddle-point gap first drops below each threshold, and
+the final gap and P1 value against the known game values. Each run is a
+fresh process so RSS and timings do not leak between runs; evaluation
+time is excluded from the solver clock. Compare two result files with
+--baseline to spot regressions between commits.
+"""
+import io
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import contextlib
+import subprocess
+import multiprocessing
+import numpy as np
+
+GAMES = ["rock_paper_superscissors", "kuhn_poker", "leduc_poker",
+         "liarsdice_1die_1bid", "liarsdice_5die_1bid", "liarsdice_5die_quantity"]
+# P1 game values recorded in commands.txt
+TARGETS = {"rock_paper_superscissors": 0.0, "kuhn_poker": -0.055, "leduc_poker": -0.085}
+THRESHOLDS = [1e-1, 1e-2, 1e-3]
+# (solver, engine, default iterations)
+SOLVERS = [
+    ("3.2", "dict", 1000), ("3.2", "vector", 1000),
+    ("3.3", "dict", 1000), ("3.3", "vector", 1000),
+    ("cfr_train", "dict", 1000), ("cfr_train", "vector", 1000),
+]
+MCCFR_SOLVERS = [("mccfr_train", "dict", 100_000), ("mccfr_train", "batched", 2_000_000)]
+MCCFR_GAME = "quantity_5d6_multiset"
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Recorder:
+    """
+    Solver callback: evaluates the average strategies at ~`points`
+    geometrically spaced iterations and tracks time-to-gap, pausing the
+    solver clock while it evaluates.
+    """
+    def __init__(self, iterations, evaluate, points=50):
+        self.evaluate = evaluate
+        self.points = set(np.unique(np.geomspace(1, iterations, points).astype(int)).tolist())
+        self.points.add(iterations)
+        self.hit = {th: None for th in THRESHOLDS}
+        self.last = (float("nan"), float("nan"))
+        self.eval_time = 0.0
+        self.start = time.perf_counter()
+
+    def solver_seconds(self):
+        return time.perf_counter() - self.start - self.eval_time
+
+    def __call__(self, t, average):
+        if t not in self.points:
+            return
+        mark = time.perf_counter()
+        self.last = self.evaluate(*average())
+        gap = self.last[0]
+        for th, hit in self.hit.items():
+            if hit is None and gap <= th:
+                self.hit[th] = {"iteration": t, "seconds": mark - self.start - self.eval_time}
+        self.eval_time += time.perf_counter() - mark
+
+
+def run_case(solver, engine, game_name, iterations):
+    from stub import load_game, solve_problem_3_2, solve_problem_3_3
+    from compiled_game import CompiledGame
+    from vector_cfr import gap
+
+    base_rss = peak_rss_mb()
+    if solver == "mccfr_train":
+        return run_mccfr(engine, iterations, base_rss)
+    path = os.path.join(HERE, "games", game_name + ".json")
+    game = load_game(path, compiled=engine == "vector")
+    cg = game["compiled"] if "compiled" in game else CompiledGame.from_game(game)
+
+    def evaluate(x, y):
+        if isinstance(x, dict):
+            x, y = cg.pl1.to_array(x), cg.pl2.to_array(y)
+        return float(gap(cg, x, y)), float(cg.expected_utility_pl1(x, y))
+
+    rec = Recorder(iterations, evaluate)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if solver == "3.2":
+            solve_problem_3_2(game, engine, iterations, rec)
+        elif solver == "3.3":
+            solve_problem_3_3(game, engine, iterations, rec)
+        else:
+            from cfr_train import extract_nash_policy
+            with tempfile.NamedTemporaryFile(suffix=".json") as out:
+                extract_nash_policy(path, out.name, iterations, engine=engine, callback=rec)
+    return result(rec, iterations, base_rss, TARGETS.get(game_name))
+
+
+def run_mccfr(engine, iterations, base_rss):
+    from mccfr_train import mccfr_plus, mccfr_plus_batched
+    from exploitability import policy_exploitability
+
+    def evaluate(r):
+        return r["nash_conv"], r["value"]
+
+    rec = Recorder(iterations, evaluate)
+    with contextlib.redirect_stdout(io.StringIO()):
+        if engine == "batched":
+            # steps land on multiples of the batch; evaluate at the first step past each point
+            points = sorted(rec.points)
+            pending = {"i": 0}
+
+            def on_step(done, tables):
+                if pending["i"] < len(points) and done >= points[pending["i"]]:
+                    while pending["i"] < len(points) and points[pending["i"]] <= done:
+                        pending["i"] += 1
+                    rec.points.add(done)
+                    rec(done, lambda: (tables.exploitability(),))
+
+            mccfr_plus_batched(iterations, seed=0, callback=on_step)
+        else:
+            import random
+            random.seed(0)
+            policy = mccfr_plus(iterations)
+            rec(iterations, lambda: (policy_exploitability(policy),))
+    return result(rec, iterations, base_rss, None)
+
+
+def result(rec, iterations, base_rss, target):
+    seconds = rec.solver_seconds()
+    final_gap, value = rec.last
+    return {
+        "iterations": iterations,
+        "seconds": seconds,
+        "it_per_sec": iterations / seconds,
+        "base_rss_mb": base_rss,
+        "peak_rss_mb": peak_rss_mb(),
+        "final_gap": final_gap,
+        "final_value": value,
+        "target_value": target,
+        "value_error": None if target is None else abs(value - target),
+        "time_to_gap": {f"{th:g}": hit for th, hit in rec.hit.items()},
+    }
+
+
+def commit_id():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(rows, baseline_path, tolerance):
+    # flag runs whose throughput dropped or whose final gap grew past tolerance
+    with open(baseline_path) as f:
+        base = {(r["solver"], r["engine"], r["game"]): r for r in map(json.loads, f)}
+    regressions = 0
+    for r in rows:
+        b = base.get((r["solver"], r["engine"], r["game"]))
+        if b is None:
+            continue
+        speed = r["it_per_sec"] / b["it_per_sec"]
+        worse_gap = r["final_gap"] > b["final_gap"] * (1 + tolerance) + 1e-12
+        flag = speed < 1 - tolerance or worse_gap
+        regressions += flag
+        print(f"{'REGRESSION' if flag else 'ok':<10} {r['solver']:<11} {r['engine']:<7} {r['game']:<26} "
+              f"speed x{speed:5.2f}   gap {b['final_gap']:.2e} -> {r['final_gap']:.2e}")
+    return regressions
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Solver benchmark suite over the bundled games")
+    p.add_argument("--games", nargs="+", default=GAMES)
+    p.add_argument("--solvers", nargs="+",
+                   default=["3.2", "3.3", "cfr_train", "mccfr_train"],
+                   help="subset of 3.2, 3.3, cfr_train, mccfr_train")
+    p.add_argument("--iters", type=int, help="override every solver's iteration count")
+    p.add_argument("--out", default="bench_results.jsonl", help="JSON-lines file to append to")
+    p.add_argument("--baseline", help="earlier results file to compare against")
+    p.add_argument("--tolerance", type=float, default=0.2,
+                   help="relative slowdown / gap increase reported as a regression")
+    args = p.parse_args()
+
+    cases = [(s, e, g, n) for s, e, n in SOLVERS if s in args.solvers for g in args.games]
+    if "mccfr_train" in args.solvers:
+        cases += [(s, e, MCCFR_GAME, n) for s, e, n in MCCFR_SOLVERS]
+    ctx = multiprocessing.get_context("spawn")
+    commit, stamp = commit_id(), time.strftime("%Y-%m-%dT%H:%M:%S")
+    rows = []
+    with open(args.out, "a") as out:
+        for solver, engine, game, iters in cases:
+            iters = args.iters or iters
+            with ctx.Pool(1) as pool:
+                r = pool.apply(run_case, (solver, engine, game, iters))
+            row = {"commit": commit, "timestamp": stamp, "solver": solver, "engine": engine,
+                   "game": game, **r}
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            rows.append(row)
+            value = f"{row['final_value']:+.4f}" + (f" (target {row['target_value']:+.3f})"
+                                                    if row["target_value"] is not None else "")
+            reached = [th for th, hit in row["time_to_gap"].items() if hit is not None]
+            print(f"{solver:<11} {engine:<7} {game:<26} {row['it_per_sec']:>11,.0f} it/s  "
+                  f"{row['peak_rss_mb']:6.0f} MB  gap {row['final_gap']:.2e}  value {value}  "
+                  f"gap reached: {', '.join(reached) or '-'}")
+    print(f"Appended {len(rows)} results to {args.out}")
+    if args.baseline:
+        compare(rows, args.baseline, args.tolerance)
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+import os
+import json
+import numpy as np
+from compiled_game import CompiledGame
+
+# On-disk layout of a binary game store (a directory, conventionally *.sfgame):
+#   header.json        decision_problem_pl1/pl2 and num_entries
+#   sequence_pl1.i32   little-endian int32 pl1 sequence ids, one per entry
+#   sequence_pl2.i32   little-endian int32 pl2 sequence ids
+#   value.f64          little-endian float64 payoffs for pl1
+# Sequence ids follow compiled_game.SequenceSpace order (tfsdp order, then
+# action order), so the columns load straight into a CompiledGame.
+
+FORMAT_VERSION = 1
+COLUMNS = (("sequence_pl1.i32", "<i4"), ("sequence_pl2.i32", "<i4"), ("value.f64", "<f8"))
+
+
+def is_binary_game(path):
+    return os.path.isfile(os.path.join(path, "header.json"))
+
+
+class BinaryGameWriter:
+    """
+    Appends utility entries column by column, so memory stays bounded by the
+    size of one appended chunk. The header is written (atomically) only on a
+    clean close(), so an interrupted write leaves no loadable store.
+    """
+    def __init__(self, path, decision_problem_pl1, decision_problem_pl2):
+        os.makedirs(path, exist_ok=True)
+        # a stale header would describe the columns about to be truncated
+        header = os.path.join(path, "header.json")
+        if os.path.exists(header):
+            os.remove(header)
+        self.path = path
+        self.decision_problems = (decision_problem_pl1, decision_problem_pl2)
+        self.files = [open(os.path.join(path, name), "wb") for name, _ in COLUMNS]
+        self.num_entries = 0
+
+    def append(self, seq_pl1, seq_pl2, values):
+        for f, col, (_, dtype) in zip(self.files, (seq_pl1, seq_pl2, values), COLUMNS):
+            np.asarray(col, dtype=dtype).tofile(f)
+        self.num_entries += len(values)
+
+    def close(self, complete=True):
+        for f in self.files:
+            f.close()
+        if not complete:
+            return
+        header = os.path.join(self.path, "header.json")
+        with open(header + ".tmp", "w") as f:
+            json.dump({
+                "format": FORMAT_VERSION,
+                "num_entries": self.num_entries,
+                "decision_problem_pl1": self.decision_problems[0],
+                "decision_problem_pl2": self.decision_problems[1],
+            }, f)
+        os.replace(header + ".tmp", header)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # on an error or interrupt the columns are partial: write no header
+        self.close(complete=exc_type is None)
+
+
+def load_binary_game(path):
+    """
+    Open a binary game store. The payoff columns are memory-mapped, not read,
+    and the returned game only carries the decision problems plus
+    game["compiled"]; there is no "utility_pl1" list.
+    """
+    with open(os.path.join(path, "header.json")) as f:
+        header = json.load(f)
+    if header["format"] != FORMAT_VERSION:
+        raise ValueError(f"{path}: unsupported binary game format {header['format']}")
+    for tfsdp in (header["decision_problem_pl1"], header["decision_problem_pl2"]):
+        for node in tfsdp:
+            if isinstance(node.get("parent_edge"), list):
+                node["parent_edge"] = tuple(node["parent_edge"])
+            if isinstance(node.get("parent_sequence"), list):
+                node["parent_sequence"] = tuple(node["parent_sequence"])
+    rows, cols, values = (
+        np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=(header["num_entries"],))
+        if header["num_entries"] else np.zeros(0, dtype=dtype)
+        for name, dtype in COLUMNS
+    )
+    game = {
+        "decision_problem_pl1": header["decision_problem_pl1"],
+        "decision_problem_pl2": header["decision_problem_pl2"],
+    }
+    game["compiled"] = CompiledGame(game["decision_problem_pl1"], game["decision_problem_pl2"],
+                                    rows, cols, values)
+    return game
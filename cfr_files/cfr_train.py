@@ -1,60 +1,161 @@
 #!/usr/bin/env python3
 import json
 import argparse
+import numpy as np
 from stub import (
     Cfr,
+    load_game,
     get_sequence_set,
     compute_utility_vector_pl1,
     compute_utility_vector_pl2,
-    RegretMatchingPlus
+    expected_utility_pl1,
+    gap,
+    RegretMatching,
+    RegretMatchingPlus,
+    DiscountedRegretMatching,
+    LinearRegretMatching,
 )
+from vector_cfr import solve, average_policy, VectorCfr, DiscountedVectorCfr, LinearVectorCfr
+from compiled_game import SequenceSpace
+from checkpoint import save_checkpoint, load_checkpoint
+import telemetry
 
 
-def extract_nash_policy(game_path, out_policy_path, iterations=50000):
+ALGORITHMS = ["cfr", "cfr+", "lcfr", "dcfr"]
+
+
+def make_algorithm(name, alpha=1.5, beta=0.0, gamma=2.0):
+    """
+    (rm_class for stub.Cfr, regret minimizer factory for vector_cfr.solve)
+    for one of ALGORITHMS; alpha/beta/gamma only apply to dcfr.
+    """
+    if name == "cfr":
+        return RegretMatching, lambda space: VectorCfr(space)
+    if name == "cfr+":
+        return RegretMatchingPlus, lambda space: VectorCfr(space, plus=True)
+    if name == "lcfr":
+        return LinearRegretMatching, LinearVectorCfr
+    return (lambda actions: DiscountedRegretMatching(actions, alpha, beta),
+            lambda space: DiscountedVectorCfr(space, alpha, beta, gamma))
+
+
+def extract_nash_policy(game_path, out_policy_path, iterations=50000, compiled=False,
+                        engine="dict", checkpoint=None, checkpoint_every=0,
+                        resume=False, warm_start=None, algorithm="cfr+",
+                        alpha=1.5, beta=0.0, gamma=2.0, alternating=False, callback=None):
+    """
+    Self-play with `algorithm` (CFR+ by default, see make_algorithm) on
+    `game_path`; writes the average P1 policy. With `alternating` P2 updates
+    against P1's freshly updated strategy instead of simultaneously.
+    `callback(t, average)` runs after every iteration; average() returns the
+    current average strategies as arrays in SequenceSpace order.
+    Every `checkpoint_every` iterations the regrets, cumulative strategies
+    and iteration counter go to `checkpoint`. `resume` continues exactly from
+    that checkpoint; `warm_start` instead seeds only the regrets from another
+    checkpoint of the same game and restarts the averages.
+    """
     # 1) load and normalize JSON sequences
-    game = json.load(open(game_path))
-    for tfsdp in (game["decision_problem_pl1"], game["decision_problem_pl2"]):
-        for node in tfsdp:
-            if isinstance(node.get("parent_edge"), list):
-                node["parent_edge"] = tuple(node["parent_edge"])
-            if "parent_sequence" in node and isinstance(node.get("parent_sequence"), list):
-                node["parent_sequence"] = tuple(node["parent_sequence"])
-    for entry in game["utility_pl1"]:
-        entry["sequence_pl1"] = tuple(entry["sequence_pl1"])
-        entry["sequence_pl2"] = tuple(entry["sequence_pl2"])
-
-    # 2) instantiate CFR+ for both players
-    cfr1 = Cfr(game["decision_problem_pl1"], rm_class=RegretMatchingPlus)
-    cfr2 = Cfr(game["decision_problem_pl2"], rm_class=RegretMatchingPlus)
+    game = load_game(game_path, compiled=compiled or engine == "vector")
+    if "compiled" in game:
+        sp1, sp2 = game["compiled"].pl1, game["compiled"].pl2
+    else:
+        sp1 = SequenceSpace(game["decision_problem_pl1"])
+        sp2 = SequenceSpace(game["decision_problem_pl2"])
+    state = None
+    if resume:
+        state = _restore(load_checkpoint(checkpoint, "cfr"), sp1, sp2, exact=True)
+        print(f"Resuming from {checkpoint} at iteration {state['iteration']}")
+    elif warm_start:
+        state = _restore(load_checkpoint(warm_start, "cfr"), sp1, sp2, exact=False)
+    rm_class, minimizer = make_algorithm(algorithm, alpha, beta, gamma)
+    weight = minimizer(sp1).average_weight
+    start = 0 if state is None else state["iteration"]
+    # running sum of averaging weights, to normalize the cumulative strategies
+    total = sum(weight(s) for s in range(1, start + 1))
+
+    def checkpoint_due(t):
+        return checkpoint and checkpoint_every and (t % checkpoint_every == 0 or t == iterations)
+
+    def save(t, regrets1, regrets2, cum1, cum2):
+        save_checkpoint(checkpoint, "cfr", t, {
+            "regrets_pl1": regrets1, "regrets_pl2": regrets2,
+            "cum_pl1": cum1, "cum_pl2": cum2,
+            "keys_pl1": _seq_keys(sp1), "keys_pl2": _seq_keys(sp2),
+        }, {"engine": engine, "game": game_path, "algorithm": algorithm,
+            "alternating": alternating})
+
+    if engine == "vector":
+        weights = {"total": total}
+
+        def on_iteration(t, c1, c2, cum1, cum2):
+            if checkpoint_due(t):
+                save(t, c1.regrets, c2.regrets, cum1, cum2)
+            weights["total"] += weight(t)
+            if callback is not None:
+                callback(t, lambda: (cum1 / weights["total"], cum2 / weights["total"]))
+
+        avg1, _ = solve(game["compiled"], iterations, log=True, state=state, callback=on_iteration,
+                        minimizer=minimizer, alternating=alternating)
+        policy = average_policy(game["compiled"].pl1, avg1)
+        with open(out_policy_path, "w") as f:
+            json.dump(policy, f, indent=2)
+        return
+
+    # 2) instantiate the regret minimizers for both players
+    cfr1 = Cfr(game["decision_problem_pl1"], rm_class=rm_class)
+    cfr2 = Cfr(game["decision_problem_pl2"], rm_class=rm_class)
     seqs1 = get_sequence_set(game["decision_problem_pl1"])
     seqs2 = get_sequence_set(game["decision_problem_pl2"])
 
     # 3) accumulators for weighted-average strategies
     cum1 = {s: 0.0 for s in seqs1}
     cum2 = {s: 0.0 for s in seqs2}
+    if state is not None:
+        for cfr, sp, r in ((cfr1, sp1, state["regrets_pl1"]), (cfr2, sp2, state["regrets_pl2"])):
+            for (I, a), v in zip(sp.sequences, r.tolist()):
+                cfr.local[I].regrets[a] = v
+        cum1 = dict(zip(sp1.sequences, state["cum_pl1"].tolist()))
+        cum2 = dict(zip(sp2.sequences, state["cum_pl2"].tolist()))
+        for rm in list(cfr1.local.values()) + list(cfr2.local.values()):
+            rm.t = start
 
-    # 4) CFR+ self-play loop
-    for t in range(1, iterations + 1):
-        strat1 = cfr1.next_strategy()
-        strat2 = cfr2.next_strategy()
+    def metrics():
+        avg1 = sp1.to_dict(sp1.to_array(cum1) / total)
+        avg2 = sp2.to_dict(sp2.to_array(cum2) / total)
+        return {"gap": gap(game, avg1, avg2), "value_pl1": expected_utility_pl1(game, avg1, avg2)}
 
-        # accumulate with weight t for averaging
-        for s in seqs1:
-            cum1[s] += t * strat1[s]
-        for s in seqs2:
-            cum2[s] += t * strat2[s]
+    # 4) self-play loop
+    tel = telemetry.active
+    strat1 = cfr1.next_strategy()
+    for t in range(start + 1, iterations + 1):
+        strat2 = cfr2.next_strategy()
 
-        # compute utility vectors against each other
-        u1 = compute_utility_vector_pl1(game, strat2)
-        u2 = compute_utility_vector_pl2(game, strat1)
+        # accumulate with the algorithm's averaging weight
+        with tel.phase("averaging"):
+            w = weight(t)
+            total += w
+            for s in seqs1:
+                cum1[s] += w * strat1[s]
+            for s in seqs2:
+                cum2[s] += w * strat2[s]
 
-        # update regrets
-        cfr1.observe_utility(u1)
-        cfr2.observe_utility(u2)
+        # update P1 against P2, then P2 against P1's old or new strategy
+        cfr1.observe_utility(compute_utility_vector_pl1(game, strat2))
+        next1 = cfr1.next_strategy()
+        cfr2.observe_utility(compute_utility_vector_pl2(game, next1 if alternating else strat1))
+        strat1 = next1
+        tel.iteration(t, metrics)
 
         # optional logging
-        if t % (iterations // 10) == 0:
-            print(f"CFR+ self-play iteration {t}/{iterations}")
+        if t % max(iterations // 10, 1) == 0:
+            print(f"{algorithm} self-play iteration {t}/{iterations}")
+        if checkpoint_due(t):
+            save(t,
+                 np.array([cfr1.local[I].regrets[a] for I, a in sp1.sequences]),
+                 np.array([cfr2.local[I].regrets[a] for I, a in sp2.sequences]),
+                 sp1.to_array(cum1), sp2.to_array(cum2))
+        if callback is not None:
+            callback(t, lambda: (sp1.to_array(cum1) / total, sp2.to_array(cum2) / total))
 
     # 5) extract average P1 policy
     policy = {}
@@ -75,6 +176,22 @@ def extract_nash_policy(game_path, out_policy_path, iterations=50000):
         json.dump(policy, f, indent=2)
 
 
+def _seq_keys(space):
+    return np.array([json.dumps(s) for s in space.sequences])
+
+
+def _restore(ck, sp1, sp2, exact):
+    # checkpoint tables of this game; a warm start keeps only the regrets
+    if not (np.array_equal(ck["keys_pl1"], _seq_keys(sp1))
+            and np.array_equal(ck["keys_pl2"], _seq_keys(sp2))):
+        raise ValueError("checkpoint was written for a different game")
+    if exact:
+        return ck
+    print(f"Warm start: regrets seeded from a checkpoint at iteration {ck['iteration']}")
+    return {"iteration": 0, "regrets_pl1": ck["regrets_pl1"], "regrets_pl2": ck["regrets_pl2"],
+            "cum_pl1": np.zeros(sp1.size), "cum_pl2": np.zeros(sp2.size)}
+
+
 if __name__ == "__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--game", required=True, help="path to JSON game file")
@@ -84,8 +201,39 @@ if __name__ == "__main__":
     )
     p.add_argument(
         "--iters", type=int, default=50000,
-        help="number of CFR+ self-play iterations"
+        help="number of self-play iterations"
+    )
+    p.add_argument("--algorithm", choices=ALGORITHMS, default="cfr+",
+                   help="vanilla, CFR+, Linear or Discounted CFR")
+    p.add_argument("--alpha", type=float, default=1.5, help="DCFR positive-regret discount exponent")
+    p.add_argument("--beta", type=float, default=0.0, help="DCFR negative-regret discount exponent")
+    p.add_argument("--gamma", type=float, default=2.0, help="DCFR averaging exponent")
+    p.add_argument("--schedule", choices=["simultaneous", "alternating"], default="simultaneous",
+                   help="update both players at once, or P2 after seeing P1's update")
+    p.add_argument("--telemetry", help="write phase timers, counters and convergence metrics (JSON lines)")
+    p.add_argument("--telemetry-every", type=int, default=100,
+                   help="iterations per telemetry record")
+    p.add_argument(
+        "--compiled", action="store_true",
+        help="compute utility vectors with the integer-indexed sparse game"
+    )
+    p.add_argument(
+        "--engine", choices=["dict", "vector"], default="dict",
+        help="per-infoset RegretMatching objects or the batched VectorCfr engine"
     )
+    p.add_argument("--checkpoint", help="where to write (and --resume from) training checkpoints")
+    p.add_argument("--checkpoint-every", type=int, default=1000,
+                   help="iterations between checkpoints (with --checkpoint)")
+    p.add_argument("--resume", action="store_true",
+                   help="continue exactly from --checkpoint")
+    p.add_argument("--warm-start", help="seed regrets from a checkpoint of this game and restart averaging")
     args = p.parse_args()
-    extract_nash_policy(args.game, args.out_policy, args.iters)
+    if args.telemetry:
+        telemetry.enable(args.telemetry, args.telemetry_every,
+                         run={"script": "cfr_train", **vars(args)})
+    extract_nash_policy(args.game, args.out_policy, args.iters, args.compiled, args.engine,
+                        args.checkpoint, args.checkpoint_every, args.resume, args.warm_start,
+                        args.algorithm, args.alpha, args.beta, args.gamma,
+                        args.schedule == "alternating")
+    telemetry.disable()
     print(f"Wrote Nash-policy for P1 to {args.out_policy}")
@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+import os
+import json
+import numpy as np
+
+# Training checkpoints are .npz archives holding:
+#   kind       "cfr" (cfr_train.py) or "mccfr" (mccfr_train.py)
+#   iteration  number of completed iterations
+#   meta       json string (engine, rng state, ...)
+#   keys_*     string keys naming the rows of the tables, checked on load
+#   any number of float64 tables (regrets, cumulative strategies)
+
+
+def save_checkpoint(path, kind, iteration, arrays, meta=None):
+    # write next to the target and rename, so a crash never leaves a torn file
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, kind=np.array(kind), iteration=np.array(iteration),
+                 meta=np.array(json.dumps(meta or {})), **arrays)
+    os.replace(tmp, path)
+
+
+def load_checkpoint(path, kind):
+    with np.load(path) as z:
+        ck = {k: z[k] for k in z.files}
+    if str(ck["kind"]) != kind:
+        raise ValueError(f"{path} is a {ck['kind']} checkpoint, expected {kind}")
+    ck["iteration"] = int(ck["iteration"])
+    ck["meta"] = json.loads(str(ck["meta"]))
+    return ck
+
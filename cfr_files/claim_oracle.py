@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Closed-form claim-truth probabilities. A claim Q_F is true when at least
+Q dice show F; holding k of them, it is true with probability
+P(Binomial(n, 1/max_face) >= Q - k) over the opponent's n dice.
+
+    oracle = ClaimOracle()
+    oracle.prob((1, 3, 3, 5, 6), 5, "claim_4_3")     # one table lookup
+    oracle.probs(k, n, Q)                            # arrays of own counts, dice, quantities
+
+    python claim_oracle.py --hand 1 3 3 5 6 --opp-dice 5
+"""
+import argparse
+from math import comb
+from functools import lru_cache
+from itertools import combinations_with_replacement
+import numpy as np
+
+
+@lru_cache(maxsize=None)
+def binomial_tail(max_dice, max_face):
+    """tail[n, k] = P(Binomial(n, 1/max_face) >= k) for n, k in 0..max_dice (k = max_dice+1 gives 0)."""
+    p = 1 / max_face
+    pmf = np.zeros((max_dice + 1, max_dice + 2))
+    for n in range(max_dice + 1):
+        pmf[n, :n + 1] = [comb(n, j) * p**j * (1 - p)**(n - j) for j in range(n + 1)]
+    tail = pmf[:, ::-1].cumsum(axis=1)[:, ::-1]
+    tail.setflags(write=False)
+    return tail
+
+
+class ClaimOracle:
+    """
+    P(claim true | own hand, opponent's dice) for every hand of 0..max_dice
+    dice, opponent dice count 0..max_dice and claim_Q_F with Q up to
+    2 * max_dice, precomputed as one float32 table [hand, n, claim].
+    """
+    def __init__(self, max_dice=5, max_face=6):
+        self.max_dice, self.max_face = max_dice, max_face
+        self.claims = [f"claim_{Q}_{F}" for Q in range(1, 2*max_dice+1) for F in range(1, max_face+1)]
+        self.claim_index = {c: i for i, c in enumerate(self.claims)}
+        self.claim_Q = np.repeat(np.arange(1, 2*max_dice+1), max_face)
+        self.claim_F = np.tile(np.arange(1, max_face+1), 2*max_dice)
+        self.tail = binomial_tail(max_dice, max_face)
+        hands = [h for n in range(max_dice + 1)
+                 for h in combinations_with_replacement(range(1, max_face+1), n)]
+        self.hand_index = {h: i for i, h in enumerate(hands)}
+        counts = np.array([[h.count(f) for f in self.claim_F] for h in hands]).reshape(len(hands), -1)
+        self.table = self.tail[:, self._need(counts)].transpose(1, 0, 2).astype(np.float32)
+
+    def _need(self, k, Q=None):
+        # opponent dice still needed, clipped to the tail table's columns
+        return np.clip((self.claim_Q if Q is None else Q) - k, 0, self.max_dice + 1)
+
+    def prob(self, hand, n, claim):
+        return float(self.table[self.hand_index[tuple(sorted(hand))], n, self.claim_index[claim]])
+
+    def rows(self, hands):
+        # table rows of a list of hands (any order within each hand)
+        return np.array([self.hand_index[tuple(sorted(h))] for h in hands])
+
+    def probs(self, k, n, Q):
+        """Vectorized: own dice showing the face `k`, opponent dice `n`, quantities `Q`."""
+        return self.tail[n, self._need(np.asarray(k), np.asarray(Q))]
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="P(claim true | hand, opponent dice) for every claim")
+    p.add_argument("--hand", type=int, nargs="+", required=True)
+    p.add_argument("--opp-dice", type=int, default=5)
+    p.add_argument("--max-dice", type=int, default=5)
+    args = p.parse_args()
+    oracle = ClaimOracle(args.max_dice)
+    row = oracle.table[oracle.rows([args.hand])[0], args.opp_dice]
+    print(f"table {oracle.table.shape} float32, {oracle.table.nbytes / 1024:.0f} KiB")
+    for Q in range(1, len(args.hand) + args.opp_dice + 1):
+        cells = row[(Q - 1) * oracle.max_face:Q * oracle.max_face]
+        print(f"Q={Q:<3}" + "".join(f"{v:8.4f}" for v in cells))
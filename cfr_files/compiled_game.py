@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+import numpy as np
+
+
+class SequenceSpace:
+    """
+    Dense integer indexing of one player's sequences.
+    Sequences are numbered in tfsdp order, so the actions of each decision
+    node occupy the contiguous segment starts[i]:starts[i+1].
+    """
+    def __init__(self, tfsdp):
+        self.sequences = []
+        self.infoset_ids = []
+        starts, parent = [], []
+        for node in tfsdp:
+            if node["type"] != "decision":
+                continue
+            starts.append(len(self.sequences))
+            self.infoset_ids.append(node["id"])
+            ps = node.get("parent_sequence")
+            parent.append(None if ps is None else tuple(ps))
+            for a in node["actions"]:
+                self.sequences.append((node["id"], a))
+        self.index = {s: i for i, s in enumerate(self.sequences)}
+        self.infoset_index = {I: i for i, I in enumerate(self.infoset_ids)}
+        self.size = len(self.sequences)
+        self.num_infosets = len(self.infoset_ids)
+        self.starts = np.array(starts + [self.size], dtype=np.int64)
+        self.seg = np.repeat(np.arange(self.num_infosets), np.diff(self.starts))
+        # parent sequence index per infoset; the root uses the extra slot `size`
+        self.parent = np.array(
+            [self.size if p is None else self.index[p] for p in parent],
+            dtype=np.int64
+        )
+        # infosets grouped by depth, for top-down sequence-form builds
+        depth = np.zeros(self.num_infosets, dtype=np.int64)
+        for i, p in enumerate(self.parent):
+            if p != self.size:
+                depth[i] = depth[self.seg[p]] + 1
+        seq_depth = depth[self.seg]
+        self.seq_parent = self.parent[self.seg]
+        self.levels = [np.flatnonzero(seq_depth == d) for d in range(int(depth.max(initial=-1)) + 1)]
+
+    def to_array(self, sf):
+        return np.fromiter((sf[s] for s in self.sequences), dtype=np.float64, count=self.size)
+
+    def to_dict(self, arr):
+        return dict(zip(self.sequences, arr.tolist()))
+
+
+class CompiledGame:
+    """
+    Integer-indexed form of a game json: both sequence spaces plus the payoff
+    entries as a COO matrix (row = pl1 sequence, col = pl2 sequence).
+    Utility vectors are sparse mat-vecs instead of scans over dicts.
+    """
+    def __init__(self, tfsdp1, tfsdp2, rows, cols, values):
+        self.pl1 = SequenceSpace(tfsdp1)
+        self.pl2 = SequenceSpace(tfsdp2)
+        self.rows = rows
+        self.cols = cols
+        self.values = values
+        self.reach_pl1 = _opponent_reach_pairs(tfsdp1, self.pl1, self.pl2)
+        self.reach_pl2 = _opponent_reach_pairs(tfsdp2, self.pl2, self.pl1)
+
+    @classmethod
+    def from_game(cls, game):
+        pl1 = SequenceSpace(game["decision_problem_pl1"])
+        pl2 = SequenceSpace(game["decision_problem_pl2"])
+        n = len(game["utility_pl1"])
+        rows = np.fromiter((pl1.index[tuple(e["sequence_pl1"])] for e in game["utility_pl1"]),
+                           dtype=np.int32, count=n)
+        cols = np.fromiter((pl2.index[tuple(e["sequence_pl2"])] for e in game["utility_pl1"]),
+                           dtype=np.int32, count=n)
+        values = np.fromiter((e["value"] for e in game["utility_pl1"]),
+                             dtype=np.float64, count=n)
+        return cls(game["decision_problem_pl1"], game["decision_problem_pl2"], rows, cols, values)
+
+    # array interface: strategies and utilities are dense float64 vectors
+
+    def utility_pl1(self, y):
+        return _matvec(self.rows, self.cols, self.values, y, self.pl1.size)
+
+    def utility_pl2(self, x):
+        return -_matvec(self.cols, self.rows, self.values, x, self.pl2.size)
+
+    def expected_utility_pl1(self, x, y):
+        return float(x @ self.utility_pl1(y))
+
+    def opponent_reach_pl1(self, y):
+        return _reach(self.reach_pl1, self.pl1.num_infosets, y)
+
+    def opponent_reach_pl2(self, x):
+        return _reach(self.reach_pl2, self.pl2.num_infosets, x)
+
+    # dict interface, used by the helpers in stub.py
+
+    def utility_vector_pl1(self, sf_strategy_pl2):
+        return self.pl1.to_dict(self.utility_pl1(self.pl2.to_array(sf_strategy_pl2)))
+
+    def utility_vector_pl2(self, sf_strategy_pl1):
+        return self.pl2.to_dict(self.utility_pl2(self.pl1.to_array(sf_strategy_pl1)))
+
+
+# entries per bincount; bounds the temporaries when the columns are memory-mapped
+MATVEC_CHUNK = 1 << 22
+
+def _matvec(out_idx, in_idx, values, v, n):
+    if len(values) <= MATVEC_CHUNK:
+        return np.bincount(out_idx, weights=values * v[in_idx], minlength=n)
+    out = np.zeros(n)
+    for lo in range(0, len(values), MATVEC_CHUNK):
+        hi = lo + MATVEC_CHUNK
+        out += np.bincount(out_idx[lo:hi], weights=values[lo:hi] * v[in_idx[lo:hi]], minlength=n)
+    return out
+
+def _opponent_reach_pairs(tfsdp, own, opp):
+    # (infoset, opponent sequence) pairs matched by stub.compute_opponent_reach;
+    # they depend only on the tree, so they are resolved once here
+    node_map = {n["id"]: n for n in tfsdp}
+    rows, cols = [], []
+    for i, I in enumerate(own.infoset_ids):
+        node = node_map[I]
+        while node["parent_edge"] is not None:
+            pid, sig = node["parent_edge"]
+            parent = node_map[pid]
+            if parent["type"] == "observation" and (pid, sig) in opp.index:
+                rows.append(i)
+                cols.append(opp.index[(pid, sig)])
+            node = parent
+    return np.array(rows, dtype=np.int64), np.array(cols, dtype=np.int64)
+
+def _reach(pairs, num_infosets, opp_strat):
+    rows, cols = pairs
+    reach = np.ones(num_infosets)
+    np.multiply.at(reach, rows, opp_strat[cols])
+    return reach
+
+def compile_game(game):
+    game["compiled"] = CompiledGame.from_game(game)
+    return game
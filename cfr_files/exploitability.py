@@ -1,6 +1,10 @@
 #!/usr/bin/env python3
+import ast
 import json
-from stub import compute_utility_vector_pl1, uniform_sf_strategy
+import argparse
+import numpy as np
+from stub import compute_utility_vector_pl1, uniform_sf_strategy, load_game
+from hands import sorted_hands
 
 def load_policy(path):
     with open(path) as f:
@@ -14,11 +18,8 @@ def build_strat1(policy):
         for action, p in dist.items()
     }
 
-def exploitability(game_path, policy_path, call_p):
-    game   = json.load(open(game_path))
-    for entry in game["utility_pl1"]:
-        entry["sequence_pl1"] = tuple(entry["sequence_pl1"])
-        entry["sequence_pl2"] = tuple(entry["sequence_pl2"])
+def exploitability(game_path, policy_path, call_p, compiled=False):
+    game   = load_game(game_path, compiled=compiled)
 
     policy = load_policy(policy_path)
     strat1 = build_strat1(policy)
@@ -36,11 +37,125 @@ def exploitability(game_path, policy_path, call_p):
     win_rate = (eu + 1) / 2
     return win_rate
 
+###############################################################################
+# Exact best responses in the one-turn quantity/face game (claims claim_Q_F,
+# P2 accepts or calls; P1 gets +1 if the claim holds and P2 accepted, or it
+# fails and P2 called, else -1). Instead of walking a sequence-form tree,
+# the opponent's strategy-weighted chance mass is grouped by how many dice
+# of the claimed face its hand shows (for a uniform opponent this is the
+# Binomial(num_dice, 1/max_face) face count); whether a claim holds against
+# a hand with c such dice is then a tail sum over those counts.
+###############################################################################
+
+class QuantityFaceGame:
+    def __init__(self, num_dice=5, max_face=6, opp_dice=None):
+        # P1 holds num_dice dice, P2 opp_dice (default the same); claims go up to their total
+        self.num_dice, self.max_face = num_dice, max_face
+        self.opp_dice = num_dice if opp_dice is None else opp_dice
+        total = num_dice + self.opp_dice
+        self.claims = [f"claim_{Q}_{F}" for Q in range(1, total+1) for F in range(1, max_face+1)]
+        self.claim_Q = np.repeat(np.arange(1, total+1), max_face)
+        self.claim_F = np.tile(np.arange(max_face), total)
+        self.hands, self.hand_p, self.face_count, self.count_onehot = self._hand_tables(num_dice)
+        if self.opp_dice == num_dice:
+            self.hands2, self.hand_p2, self.face_count2, self.count_onehot2 = \
+                self.hands, self.hand_p, self.face_count, self.count_onehot
+        else:
+            self.hands2, self.hand_p2, self.face_count2, self.count_onehot2 = self._hand_tables(self.opp_dice)
+
+    def _hand_tables(self, n):
+        hands, weights = sorted_hands(n, self.max_face)
+        counts = np.array([[h.count(f) for f in range(1, self.max_face+1)] for h in hands])
+        # dice of each claim's face in each hand, and its one-hot over 0..n
+        face_count = counts[:, self.claim_F]                                 # hand x claim
+        return hands, np.array(weights) / sum(weights), face_count, face_count[:, :, None] == np.arange(n + 1)
+
+    def claim_payoff(self, weights, weights_of=1):
+        """
+        payoff[h, c] = sum over the other player's hands h' of weights[h', c]
+        * (+1 if claim c holds for hands h and h', else -1); `weights` are
+        indexed by player `weights_of`'s hands, payoff by the other player's.
+        """
+        if weights_of == 1:
+            onehot, n, own = self.count_onehot, self.num_dice, self.face_count2
+        else:
+            onehot, n, own = self.count_onehot2, self.opp_dice, self.face_count
+        by_count = np.einsum("hck,hc->kc", onehot, weights)
+        # tail[k, c]: weight on hands with at least k dice of c's face
+        tail = np.zeros((n + 2, len(self.claims)))
+        tail[:-1] = by_count[::-1].cumsum(axis=0)[::-1]
+        need = np.clip(self.claim_Q - own, 0, n + 1)
+        holds = np.take_along_axis(tail, need, axis=0)
+        return 2 * holds - weights.sum(axis=0)
+
+    def exploitability(self, strat1, accept2):
+        """
+        strat1[h, c]: P1's claim probabilities per hand; accept2[h, c]: P2's
+        accept probability per (hand, claim), both in self.hands/self.hands2
+        and self.claims order. Returns P1's expected value, each player's
+        best-response value (in that player's own utility) and their sum,
+        the saddle-point gap.
+        """
+        p1, p2 = self.hand_p[:, None], self.hand_p2[:, None]
+        # P2 picks the sign of P1's chance/strategy-weighted payoff
+        vs_pl1 = self.claim_payoff(p1 * strat1, weights_of=1)
+        br_pl2 = float((p2 * np.abs(vs_pl1)).sum())
+        # P1 faces +payoff where P2 accepts and -payoff where it calls
+        vs_pl2 = self.claim_payoff(p2 * (2 * accept2 - 1), weights_of=2)
+        br_pl1 = float((self.hand_p * vs_pl2.max(axis=1)).sum())
+        value = float((p1 * strat1 * vs_pl2).sum())
+        return {"value": value, "br_pl1": br_pl1, "br_pl2": br_pl2, "nash_conv": br_pl1 + br_pl2}
+
+    def policy_tables(self, policy):
+        """
+        (strat1, accept2) from an mccfr_train.py policy dict (keys str(hand)
+        and str((hand, claim))); missing or empty rows get uniform claims and
+        50/50 responses, as in cfr_web/policy_store.py.
+        """
+        hand_idx = {h: i for i, h in enumerate(self.hands)}
+        hand_idx2 = {h: i for i, h in enumerate(self.hands2)}
+        claim_idx = {c: i for i, c in enumerate(self.claims)}
+        strat1 = np.full((len(self.hands), len(self.claims)), 1.0 / len(self.claims))
+        accept2 = np.full((len(self.hands2), len(self.claims)), 0.5)
+        for key, dist in policy.items():
+            k = ast.literal_eval(key)
+            if isinstance(k[0], tuple):
+                hand, claim = k
+                total = dist.get("accept", 0.0) + dist.get("call", 0.0)
+                if total > 0:
+                    accept2[hand_idx2[hand], claim_idx[claim]] = dist.get("accept", 0.0) / total
+            else:
+                row = np.array([dist.get(c, 0.0) for c in self.claims])
+                if row.sum() > 0:
+                    strat1[hand_idx[k]] = row / row.sum()
+        return strat1, accept2
+
+
+def policy_exploitability(policy, num_dice=5, max_face=6):
+    """Exact best responses to a hand-keyed policy dict or json path (see QuantityFaceGame)."""
+    if isinstance(policy, str):
+        policy = load_policy(policy)
+    game = QuantityFaceGame(num_dice, max_face)
+    return game.exploitability(*game.policy_tables(policy))
+
+
 if __name__=="__main__":
-    GAME   = "games/liarsdice_5die_1bid.json"
-    POLICY = "../policies/liarsdice_5die_policy.json"   # or wherever your JSON lives
+    p = argparse.ArgumentParser()
+    p.add_argument("--quantity-policy",
+                   help="hand-keyed policy json from mccfr_train.py: print its exact best responses")
+    p.add_argument("--num-dice", type=int, default=5)
+    p.add_argument("--max-face", type=int, default=6)
+    args = p.parse_args()
+
+    if args.quantity_policy:
+        r = policy_exploitability(args.quantity_policy, args.num_dice, args.max_face)
+        print(f"P1 value {r['value']:+.5f}   best response P1 {r['br_pl1']:+.5f}   "
+              f"P2 {r['br_pl2']:+.5f}   NashConv {r['nash_conv']:.5f}")
+    else:
+        GAME   = "games/liarsdice_5die_1bid.json"
+        POLICY = "../policies/liarsdice_5die_policy.json"   # or wherever your JSON lives
 
-    for call_pct in [100, 90, 80, 70, 60, 50]:
-        p = call_pct / 100
-        wr = exploitability(GAME, POLICY, p)
-        print(f"P2 calls {call_pct:>3}%   →   P1 win rate ≈ {wr:.3f}")
+        for call_pct in [100, 90, 80, 70, 60, 50]:
+            p = call_pct / 100
+            wr = exploitability(GAME, POLICY, p)
+            print(f"P2 calls {call_pct:>3}%   →   P1 win rate ≈ {wr:.3f}")
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of preprocessed game jsons. stub.load_game keeps
+next to each game json a <name>.json.<sha256[:16]>.gamecache file: a
+pickle of the game with its sequences already turned into tuples, plus
+the CompiledGame once a compiled load has built one. A later load hashes
+the json bytes together with FORMAT and the source of the modules that
+build the cached objects, and on a match skips json parsing,
+normalization and compilation. Editing the json or that code changes the
+hash, so a stale cache is never read (it is replaced on the next load);
+a cache that fails to unpickle counts as a miss. Caches are local build
+products and, being pickles, must not be taken from untrusted sources.
+
+    python game_cache.py                # cold vs warm load times of the bundled games
+    python game_cache.py --clear        # delete the caches of the bundled games
+"""
+import os
+import glob
+import time
+import pickle
+import hashlib
+import argparse
+import subprocess
+import sys
+from functools import lru_cache
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# bump when the cached layout changes in a way the sources below do not show
+FORMAT = 1
+# modules whose code shapes the pickled game: load_game's normalization and CompiledGame
+SOURCES = ("stub.py", "compiled_game.py")
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    h = hashlib.sha256(f"gamecache-{FORMAT}".encode())
+    for name in SOURCES:
+        with open(os.path.join(HERE, name), "rb") as f:
+            h.update(f.read())
+    return h.digest()
+
+
+def cache_path(path, raw):
+    return f"{path}.{hashlib.sha256(code_version() + raw).hexdigest()[:16]}.gamecache"
+
+
+def load(path, raw):
+    # the cached game for these json bytes, or None
+    try:
+        with open(cache_path(path, raw), "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # unreadable, truncated, or pickled by code that no longer matches
+        return None
+
+
+def store(path, raw, game):
+    # atomic write, then drop the caches of earlier versions of the json
+    target = cache_path(path, raw)
+    tmp = target + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(game, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, target)
+    except OSError:
+        return  # read-only checkouts just run uncached
+    list(clear(path, keep=target))
+
+
+def clear(path, keep=None):
+    """Remove the caches of game json `path` (except `keep`); yields removed paths."""
+    for p in glob.glob(glob.escape(path) + ".*.gamecache"):
+        if p != keep:
+            os.remove(p)
+            yield p
+
+
+def startup_report(paths, repeats=5):
+    # best-of-`repeats` load_game times: no cache, cold (cache miss + write), warm (cache hit)
+    from stub import load_game
+    print(f"{'game':<32}{'KB':>7}{'compiled':>10}{'uncached ms':>13}{'cold ms':>9}{'warm ms':>9}{'speedup':>9}")
+    for path in paths:
+        for compiled in (False, True):
+            times = {"uncached": [], "cold": [], "warm": []}
+            for _ in range(repeats):
+                t = time.perf_counter()
+                load_game(path, compiled, cache=False)
+                times["uncached"].append(time.perf_counter() - t)
+                list(clear(path))
+                t = time.perf_counter()
+                load_game(path, compiled)
+                times["cold"].append(time.perf_counter() - t)
+                t = time.perf_counter()
+                load_game(path, compiled)
+                times["warm"].append(time.perf_counter() - t)
+            best = {k: 1e3 * min(v) for k, v in times.items()}
+            print(f"{os.path.basename(path):<32}{os.path.getsize(path) / 1024:>7.0f}{str(compiled):>10}"
+                  f"{best['uncached']:>13.2f}{best['cold']:>9.2f}{best['warm']:>9.2f}"
+                  f"{best['uncached'] / best['warm']:>8.1f}x")
+    # whole startup of a solver process: interpreter, `import stub` and a warm compiled load
+    code = ("import time; t = time.perf_counter(); import stub; "
+            f"stub.load_game({paths[-1]!r}, True); print(time.perf_counter() - t)")
+    runs = [float(subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True,
+                                 text=True).stdout) for _ in range(repeats)]
+    print(f"fresh process, import stub + warm load of {os.path.basename(paths[-1])}: {1e3 * min(runs):.0f} ms")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Cold vs warm game loading with the preprocessed-game cache")
+    p.add_argument("games", nargs="*", default=sorted(glob.glob(os.path.join(HERE, "games", "*.json"))))
+    p.add_argument("--clear", action="store_true", help="delete the caches instead")
+    p.add_argument("--repeats", type=int, default=5)
+    args = p.parse_args()
+    if args.clear:
+        for g in args.games:
+            for removed in clear(g):
+                print("removed", removed)
+    else:
+        startup_report(args.games, args.repeats)
@@ -1,7 +1,12 @@
 #!/usr/bin/env python3
 import json
 import os
+import argparse
+import tempfile
 from itertools import product
+import numpy as np
+from binary_game import BinaryGameWriter, load_binary_game
+from hands import sorted_hands
 
 def generate_quantity_face_game(num_dice=5, max_face=6):
     """
@@ -92,9 +97,123 @@ def generate_quantity_face_game(num_dice=5, max_face=6):
         "utility_pl1": utility_pl1
     }
 
+def quantity_face_decision_problems(hands, num_dice=5, max_face=6):
+    """
+    Decision problems with one P1 infoset per observed hand and one P2
+    infoset per (hand, observed claim). Infosets are laid out hand-major,
+    claim-minor, which fixes the sequence ids used by the streamed entries.
+    """
+    labels = ["".join(map(str, h)) for h in hands]
+    claims = [f"claim_{Q}_{F}"
+              for Q in range(1, 2*num_dice+1)
+              for F in range(1, max_face+1)]
+    dp1 = [{"id": "obs_hand_pl1", "type": "observation", "signals": labels, "parent_edge": None}]
+    for lab in labels:
+        dp1.append({
+            "id": f"d1_pl1_{lab}",
+            "type": "decision",
+            "actions": claims,
+            "parent_edge": ["obs_hand_pl1", lab],
+            "parent_sequence": None
+        })
+    dp2 = [{"id": "obs_hand_pl2", "type": "observation", "signals": labels, "parent_edge": None}]
+    for lab in labels:
+        dp2.append({
+            "id": f"obs_claim_pl2_{lab}",
+            "type": "observation",
+            "signals": claims,
+            "parent_edge": ["obs_hand_pl2", lab]
+        })
+        for c in claims:
+            dp2.append({
+                "id": f"d1_pl2_{lab}_{c}",
+                "type": "decision",
+                "actions": ["accept", "call"],
+                "parent_edge": [f"obs_claim_pl2_{lab}", c],
+                "parent_sequence": None
+            })
+    return dp1, dp2
+
+def stream_quantity_face_game(path, num_dice=5, max_face=6, multiset=False):
+    """
+    Same game as generate_quantity_face_game, streamed to a binary game
+    store (binary_game.py). Entries are produced one P1 hand at a time with
+    NumPy, so memory is bounded by one row of |hands| x |claims| x 2 entries.
+    With `multiset=True` chance deals sorted hands with multinomial weights
+    instead of ordered rolls (252 instead of 7776 hands for 5d6).
+    """
+    if multiset:
+        hands, weights = sorted_hands(num_dice, max_face)
+    else:
+        hands = list(product(range(1, max_face+1), repeat=num_dice))
+        weights = [(1/max_face)**num_dice] * len(hands)
+    dp1, dp2 = quantity_face_decision_problems(hands, num_dice, max_face)
+
+    faces = np.arange(1, max_face+1)
+    counts = (np.array(hands)[:, :, None] == faces).sum(axis=1)      # hand x face
+    n_hands, n_claims = len(hands), 2*num_dice*max_face
+    claim_Q = np.repeat(np.arange(1, 2*num_dice+1), max_face)
+    claim_F = np.tile(np.arange(max_face), 2*num_dice)
+    weights = np.array(weights)
+    # accept sequence of P2 infoset (h2, claim); call is accept + 1
+    seq2_accept = 2 * (np.arange(n_hands)[:, None] * n_claims + np.arange(n_claims))
+
+    with BinaryGameWriter(path, dp1, dp2) as w:
+        for h1 in range(n_hands):
+            total = counts[h1] + counts                                  # h2 x face
+            p_chance = (weights[h1] * weights)[:, None]
+            payoff = np.where(total[:, claim_F] >= claim_Q, p_chance, -p_chance)
+            seq1 = np.broadcast_to(h1 * n_claims + np.arange(n_claims), payoff.shape)
+            w.append(
+                np.repeat(seq1.ravel(), 2),
+                np.stack([seq2_accept, seq2_accept + 1], axis=-1).ravel(),
+                np.stack([payoff, -payoff], axis=-1).ravel(),
+            )
+    return w.num_entries
+
+def check_multiset_compression(num_dice=2, max_face=4, iterations=2000):
+    """
+    Solve the ordered and the multiset game on a small configuration and
+    compare the game values of the CFR+ average strategies.
+    """
+    from vector_cfr import solve, gap
+    values = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for multiset in (False, True):
+            path = os.path.join(tmp, f"q_{multiset}.sfgame")
+            n = stream_quantity_face_game(path, num_dice, max_face, multiset)
+            cg = load_binary_game(path)["compiled"]
+            x, y = solve(cg, iterations)
+            values[multiset] = cg.expected_utility_pl1(x, y)
+            print(f"{'multiset' if multiset else 'ordered':>8}: {n:>8} entries   "
+                  f"value {values[multiset]:+.6f}   gap {gap(cg, x, y):.2e}")
+    return values[False], values[True]
+
 if __name__ == "__main__":
-    os.makedirs("games", exist_ok=True)
-    game = generate_quantity_face_game()
-    with open("games/liarsdice_5die_quantity.json", "w") as f:
-        json.dump(game, f, indent=2)
-    print("Wrote games/liarsdice_5die_quantity.json")
+    p = argparse.ArgumentParser()
+    p.add_argument("--num-dice", type=int, default=5)
+    p.add_argument("--max-face", type=int, default=6)
+    p.add_argument("--out", help="json path (default games/liarsdice_<N>die[_<F>face]_quantity.json)")
+    p.add_argument("--binary", metavar="DIR",
+                   help="stream entries to a binary game store instead of writing json")
+    p.add_argument("--multiset", action="store_true",
+                   help="with --binary, deal sorted-hand multisets with multinomial weights")
+    p.add_argument("--check-multiset", action="store_true",
+                   help="compare ordered vs multiset game values on a small configuration")
+    args = p.parse_args()
+    if args.multiset and not args.binary:
+        p.error("--multiset requires --binary")
+
+    if args.check_multiset:
+        check_multiset_compression()
+    elif args.binary:
+        n = stream_quantity_face_game(args.binary, args.num_dice, args.max_face, args.multiset)
+        print(f"Wrote {n} utility entries to {args.binary}")
+    else:
+        faces = "" if args.max_face == 6 else f"_{args.max_face}face"
+        out = args.out or f"games/liarsdice_{args.num_dice}die{faces}_quantity.json"
+        os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+        game = generate_quantity_face_game(args.num_dice, args.max_face)
+        with open(out, "w") as f:
+            json.dump(game, f, indent=2)
+        print(f"Wrote {out}")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+"""
+Sorted-multiset hands shared by the generator, the trainers and the web
+app. Kept free of heavy imports so that any of them can use it.
+"""
+from math import factorial
+from collections import Counter
+from itertools import combinations_with_replacement
+
+
+def sorted_hands(num_dice=5, max_face=6):
+    """
+    Every hand as a sorted multiset (the `tuple(sorted(hand))` keys used by
+    mccfr_train and the web app) with its multinomial chance probability.
+    """
+    hands = list(combinations_with_replacement(range(1, max_face+1), num_dice))
+    weights = []
+    for h in hands:
+        ways = factorial(num_dice)
+        for c in Counter(h).values():
+            ways //= factorial(c)
+        weights.append(ways / max_face**num_dice)
+    return hands, weights
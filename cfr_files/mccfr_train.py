@@ -1,66 +1,115 @@
 #!/usr/bin/env python3
-import random, json, argparse
+import random, json, argparse, time
+from functools import lru_cache
+from itertools import accumulate
+import numpy as np
 from stub import RegretMatchingPlus
+from hands import sorted_hands
+from checkpoint import save_checkpoint, load_checkpoint
+from exploitability import QuantityFaceGame
+import telemetry
 
 NUM_DICE, MAX_FACE = 5, 6
 
+# chance deals sorted-hand multisets directly, with multinomial weights
+HANDS, HAND_WEIGHTS = sorted_hands(NUM_DICE, MAX_FACE)
+HAND_CUM_WEIGHTS = list(accumulate(HAND_WEIGHTS))
+
 def all_claims():
     return [f"claim_{Q}_{F}"
             for Q in range(1, 2*NUM_DICE+1)
             for F in range(1, MAX_FACE+1)]
 
-def mccfr_plus(iters):
+def mccfr_plus(iters, checkpoint=None, checkpoint_every=0, resume=False, warm_start=None,
+               oracle=False):
+    # with `oracle`, P1's utilities are their exact expectation over P2's hand (exact_util1)
     actions1 = all_claims()
     actions2 = ["accept","call"]
 
     # Regret tables & accumulators
     rm1, sum1 = {}, {}
     rm2, sum2 = {}, {}
+    start = 0
+    if resume or warm_start:
+        tables, start, meta = MccfrTables.load(checkpoint if resume else warm_start, exact=resume)
+        rm1, sum1, rm2, sum2 = tables.to_dicts(meta.get("order1"), meta.get("order2"))
+        if resume:
+            v, internal, gauss = meta["python_random"]
+            random.setstate((v, tuple(internal), gauss))
+    # P2's current accept probability per (hand, claim), kept in step with rm2,
+    # and P(h2) * (2 accept - 1), the weight of each P2 hand in P1's expected utility
+    accept2 = np.full((len(HANDS), len(CLAIMS)), 0.5)
+    for (h2, c), rm in rm2.items():
+        accept2[HAND_INDEX[h2], CLAIM_INDEX[c]] = _accept_prob(rm)
+    weights2 = HAND_P[:, None] * (2 * accept2 - 1)
 
-    for t in range(1, iters+1):
+    tel = telemetry.active
+    metrics = lambda: {"nash_conv": MccfrTables.from_dicts(rm1, sum1, rm2, sum2)[0].exploitability()["nash_conv"]}
+    for t in range(start+1, iters+1):
         # Sample chance
-        r1 = tuple(sorted(random.randint(1,MAX_FACE) for _ in range(NUM_DICE)))
-        r2 = tuple(sorted(random.randint(1,MAX_FACE) for _ in range(NUM_DICE)))
+        with tel.phase("sample"):
+            r1, r2 = random.choices(HANDS, cum_weights=HAND_CUM_WEIGHTS, k=2)
 
         # P1 infoset
-        if r1 not in rm1:
-            rm1[r1]  = RegretMatchingPlus(actions1)
-            sum1[r1] = {a:0.0 for a in actions1}
-        strat1 = rm1[r1].next_strategy()
-        for a,p in strat1.items(): sum1[r1][a] += p
+        with tel.phase("strategy"):
+            if r1 not in rm1:
+                rm1[r1]  = RegretMatchingPlus(actions1)
+                sum1[r1] = {a:0.0 for a in actions1}
+                tel.count("infosets_created")
+            strat1 = rm1[r1].next_strategy()
+            for a,p in strat1.items(): sum1[r1][a] += p
 
         # Sample P1 action
-        claim = random.choices(actions1, weights=[strat1[a] for a in actions1])[0]
-        Q,F   = map(int, claim.split("_")[1:])
+        with tel.phase("sample"):
+            claim = random.choices(actions1, weights=[strat1[a] for a in actions1])[0]
+            Q,F   = map(int, claim.split("_")[1:])
 
         # P2 infoset
-        key2 = (r2, claim)
-        if key2 not in rm2:
-            rm2[key2]  = RegretMatchingPlus(actions2)
-            sum2[key2] = {a:0.0 for a in actions2}
-        strat2 = rm2[key2].next_strategy()
-        for a,p in strat2.items(): sum2[key2][a] += p
+        with tel.phase("strategy"):
+            key2 = (r2, claim)
+            if key2 not in rm2:
+                rm2[key2]  = RegretMatchingPlus(actions2)
+                sum2[key2] = {a:0.0 for a in actions2}
+                tel.count("infosets_created")
+            strat2 = rm2[key2].next_strategy()
+            for a,p in strat2.items(): sum2[key2][a] += p
 
         # Sample P2 response
-        response = random.choices(actions2, weights=[strat2[a] for a in actions2])[0]
+        with tel.phase("sample"):
+            response = random.choices(actions2, weights=[strat2[a] for a in actions2])[0]
 
         # Payoff
         totalF = r1.count(F) + r2.count(F)
         payoff1 = 1 if totalF >= Q else -1
 
         # Update regrets
-        util1 = {a: (1 if totalF >= int(a.split("_")[1]) else -1)
-                 for a in actions1}
-        rm1[r1].observe_utility(util1)
+        with tel.phase("regret_update"):
+            # P1 gets the claim's +-1 truth where P2 accepts and its negation where P2 calls
+            h1, h2 = HAND_INDEX[r1], HAND_INDEX[r2]
+            if oracle:
+                # exact_util1 for this one hand
+                u1 = (weights2 * np.where(FACE_COUNT[h1] + FACE_COUNT >= CLAIM_Q, 1.0, -1.0)).sum(axis=0)
+            else:
+                u1 = np.where(FACE_COUNT[h1] + FACE_COUNT[h2] >= CLAIM_Q, 1.0, -1.0) * (2 * accept2[h2] - 1)
+            rm1[r1].observe_utility(dict(zip(actions1, u1.tolist())))
 
-        util2 = {
-          "accept": -(payoff1),
-          "call":    payoff1
-        }
-        rm2[key2].observe_utility(util2)
+            util2 = {
+              "accept": -(payoff1),
+              "call":    payoff1
+            }
+            rm2[key2].observe_utility(util2)
+            c = CLAIM_INDEX[claim]
+            accept2[h2, c] = _accept_prob(rm2[key2])
+            weights2[h2, c] = HAND_P[h2] * (2 * accept2[h2, c] - 1)
+        tel.count("infosets_touched", 2)
+        tel.iteration(t, metrics)
 
         if t % (iters//10) == 0:
             print(f"MCCFR+ iter {t}/{iters}")
+        if checkpoint and checkpoint_every and (t % checkpoint_every == 0 or t == iters):
+            tables, order1, order2 = MccfrTables.from_dicts(rm1, sum1, rm2, sum2)
+            tables.save(checkpoint, t, {"trainer": "mccfr_plus", "order1": order1,
+                                        "order2": order2, "python_random": random.getstate()})
 
     # Extract average policy
     policy = {}
@@ -71,13 +120,290 @@ def mccfr_plus(iters):
 
     return policy
 
+CLAIMS = all_claims()
+HAND_INDEX = {h: i for i, h in enumerate(HANDS)}
+CLAIM_INDEX = {c: i for i, c in enumerate(CLAIMS)}
+CLAIM_Q = np.array([int(c.split("_")[1]) for c in CLAIMS])
+CLAIM_F = np.array([int(c.split("_")[2]) for c in CLAIMS]) - 1
+# face-count histogram of every sorted hand
+HAND_COUNTS = np.array([[h.count(f) for f in range(1, MAX_FACE+1)] for h in HANDS])
+# dice of each claim's face in each hand
+FACE_COUNT = HAND_COUNTS[:, CLAIM_F]
+HAND_P = np.array(HAND_WEIGHTS) / sum(HAND_WEIGHTS)
+
+@lru_cache(maxsize=None)
+def _game():
+    return QuantityFaceGame(NUM_DICE, MAX_FACE)
+
+def exact_util1(accept2):
+    """
+    P1's expected utility of every claim for every hand against P2's accept
+    probabilities accept2[hand, claim]: the sum over P2's hands h2 of
+    P(h2) * (2 accept2[h2, c] - 1) * (+-1 claim truth), as exact tail sums
+    over P2's face counts (exploitability.QuantityFaceGame).
+    """
+    return _game().claim_payoff(HAND_P[:, None] * (2 * accept2 - 1), weights_of=2)
+
+def _accept_prob(rm):
+    # P(accept) of a P2 RegretMatchingPlus's next strategy, without touching its state
+    acc, call = max(rm.regrets["accept"], 0.0), max(rm.regrets["call"], 0.0)
+    return acc / (acc + call) if acc + call > 0 else 0.5
+
+def _scatter_add(table, rows, vals):
+    # np.add.at(table, rows, vals) via one bincount over flat indices
+    w = table.shape[1]
+    flat = (rows[:, None] * w + np.arange(w)).ravel()
+    table += np.bincount(flat, weights=vals.ravel(), minlength=table.size).reshape(table.shape)
+
+def _regret_matching(reg):
+    pos = np.maximum(reg, 0.0)
+    tot = pos.sum(axis=1, keepdims=True)
+    return np.where(tot > 0, pos / np.where(tot > 0, tot, 1.0), 1.0 / reg.shape[1])
+
+class MccfrTables:
+    """
+    Dense MCCFR+ state: regrets and strategy sums for P1 (hand x claim) and
+    P2 ((hand, claim) x response), indexed by HANDS and CLAIMS order.
+    """
+    FIELDS = ("reg1", "sum1", "reg2", "sum2", "seen1", "seen2")
+
+    def __init__(self):
+        n_hands, n_claims = len(HANDS), len(CLAIMS)
+        self.reg1 = np.zeros((n_hands, n_claims))
+        self.sum1 = np.zeros((n_hands, n_claims))
+        self.reg2 = np.zeros((n_hands * n_claims, 2))
+        self.sum2 = np.zeros((n_hands * n_claims, 2))
+        self.seen1 = np.zeros(n_hands, dtype=bool)
+        self.seen2 = np.zeros(n_hands * n_claims, dtype=bool)
+
+    def copy(self):
+        t = MccfrTables.__new__(MccfrTables)
+        for f in self.FIELDS:
+            setattr(t, f, getattr(self, f).copy())
+        return t
+
+    @staticmethod
+    def keys():
+        # row names: the policy json keys of each P1 and P2 infoset
+        return (np.array([str(h) for h in HANDS]),
+                np.array([str((h, c)) for h in HANDS for c in CLAIMS]))
+
+    def save(self, path, iteration, meta):
+        keys1, keys2 = self.keys()
+        arrays = {f: getattr(self, f) for f in self.FIELDS}
+        save_checkpoint(path, "mccfr", iteration, dict(arrays, keys_pl1=keys1, keys_pl2=keys2), meta)
+
+    @classmethod
+    def load(cls, path, exact=True):
+        """
+        (tables, iteration, meta) from a checkpoint. Without `exact` only the
+        regrets are taken (a warm start). Either way the checkpoint must come
+        from this game: the trainer is fixed at NUM_DICE, and hand-keyed rows
+        of another dice count share no infosets with it.
+        """
+        ck = load_checkpoint(path, "mccfr")
+        keys1, keys2 = cls.keys()
+        if not (np.array_equal(ck["keys_pl1"], keys1) and np.array_equal(ck["keys_pl2"], keys2)):
+            raise ValueError(f"{path} was written for a different game")
+        t = cls()
+        if exact:
+            for f in cls.FIELDS:
+                getattr(t, f)[...] = ck[f]
+            return t, ck["iteration"], ck["meta"]
+        t.reg1[...], t.reg2[...] = ck["reg1"], ck["reg2"]
+        print(f"Warm start: regrets seeded from {path} (iteration {ck['iteration']})")
+        return t, 0, {}
+
+    @classmethod
+    def from_dicts(cls, rm1, sum1, rm2, sum2):
+        # mccfr_plus state -> tables, plus the infosets' first-visit order
+        t = cls()
+        order1, order2 = [], []
+        for r1 in rm1:
+            h = HAND_INDEX[r1]
+            t.reg1[h] = [rm1[r1].regrets[a] for a in CLAIMS]
+            t.sum1[h] = [sum1[r1][a] for a in CLAIMS]
+            order1.append(h)
+        for r2, claim in rm2:
+            k = HAND_INDEX[r2] * len(CLAIMS) + CLAIM_INDEX[claim]
+            t.reg2[k] = [rm2[(r2, claim)].regrets[a] for a in ("accept", "call")]
+            t.sum2[k] = [sum2[(r2, claim)][a] for a in ("accept", "call")]
+            order2.append(k)
+        t.seen1[order1] = True
+        t.seen2[order2] = True
+        return t, order1, order2
+
+    def to_dicts(self, order1=None, order2=None):
+        # inverse of from_dicts; a warm start has no visit order, so every
+        # infoset with nonzero regret gets an entry
+        if order1 is None:
+            order1 = np.flatnonzero(self.reg1.any(axis=1)).tolist()
+            order2 = np.flatnonzero(self.reg2.any(axis=1)).tolist()
+        rm1, sum1, rm2, sum2 = {}, {}, {}, {}
+        for h in order1:
+            r1 = HANDS[h]
+            rm1[r1] = RegretMatchingPlus(CLAIMS)
+            rm1[r1].regrets = dict(zip(CLAIMS, self.reg1[h].tolist()))
+            sum1[r1] = dict(zip(CLAIMS, self.sum1[h].tolist()))
+        for k in order2:
+            h, c = divmod(k, len(CLAIMS))
+            key2 = (HANDS[h], CLAIMS[c])
+            rm2[key2] = RegretMatchingPlus(["accept", "call"])
+            rm2[key2].regrets = dict(zip(["accept", "call"], self.reg2[k].tolist()))
+            sum2[key2] = dict(zip(["accept", "call"], self.sum2[k].tolist()))
+        return rm1, sum1, rm2, sum2
+
+    def step(self, b, rng, oracle=False):
+        """
+        Play `b` sampled deals against the current strategies and update.
+        P1's utility for each claim is its +-1 truth against the sampled P2
+        hand, signed by P2's current accept/call mix there; with `oracle`
+        it is the exact expectation over P2's hand (exact_util1).
+        """
+        n_claims = len(CLAIMS)
+        tel = telemetry.active
+        # Sample chance
+        with tel.phase("sample"):
+            r1, r2 = rng.choice(len(HANDS), size=(2, b), p=HAND_P)
+
+        # P1 infosets
+        with tel.phase("strategy"):
+            strat1 = _regret_matching(self.reg1[r1])
+            _scatter_add(self.sum1, r1, strat1)
+            self.seen1[r1] = True
+
+        # Sample P1 claims (inverse CDF per deal)
+        with tel.phase("sample"):
+            cum = strat1.cumsum(axis=1)
+            claim = np.minimum((cum <= rng.random(b)[:, None] * cum[:, -1:]).sum(axis=1), n_claims - 1)
+
+        # P2 infosets
+        with tel.phase("strategy"):
+            key2 = r2 * n_claims + claim
+            strat2 = _regret_matching(self.reg2[key2])
+            _scatter_add(self.sum2, key2, strat2)
+            self.seen2[key2] = True
+
+        # Payoff of every claim for every deal
+        with tel.phase("payoff"):
+            totalF = HAND_COUNTS[r1] + HAND_COUNTS[r2]
+            truth = np.where(totalF[:, CLAIM_F] >= CLAIM_Q, 1.0, -1.0)
+            accept2 = _regret_matching(self.reg2)[:, 0].reshape(len(HANDS), n_claims)
+            util1 = exact_util1(accept2)[r1] if oracle else truth * (2 * accept2[r2] - 1)
+            payoff1 = truth[np.arange(b), claim]
+
+        # Update regrets
+        with tel.phase("regret_update"):
+            _scatter_add(self.reg1, r1, util1 - (strat1 * util1).sum(axis=1, keepdims=True))
+            np.maximum(self.reg1, 0.0, out=self.reg1)
+            util2 = np.stack([-payoff1, payoff1], axis=1)
+            _scatter_add(self.reg2, key2, util2 - (strat2 * util2).sum(axis=1, keepdims=True))
+            np.maximum(self.reg2, 0.0, out=self.reg2)
+        tel.count("infosets_touched", 2 * b)
+
+    def average_strategies(self):
+        """
+        Normalized average strategies as flat arrays in the sequence order of
+        the multiset quantity/face game (stream_quantity_face_game(multiset=True)).
+        """
+        def rows(sums, n):
+            tot = sums.sum(axis=1, keepdims=True)
+            return np.where(tot > 0, sums / np.where(tot > 0, tot, 1.0), 1.0 / n).ravel()
+        return rows(self.sum1, len(CLAIMS)), rows(self.sum2, 2)
+
+    def exploitability(self):
+        # exact best responses to the average strategies (value, br_pl1, br_pl2, nash_conv)
+        x, y = self.average_strategies()
+        shape = self.sum1.shape
+        return QuantityFaceGame(NUM_DICE, MAX_FACE).exploitability(
+            x.reshape(shape), y.reshape(-1, 2)[:, 0].reshape(shape))
+
+    def policy(self, iters):
+        # same format as mccfr_plus: visited infosets, sums divided by iters
+        policy = {}
+        for h in np.flatnonzero(self.seen1):
+            policy[str(HANDS[h])] = dict(zip(CLAIMS, (self.sum1[h] / iters).tolist()))
+        for k in np.flatnonzero(self.seen2):
+            h, c = divmod(int(k), len(CLAIMS))
+            policy[str((HANDS[h], CLAIMS[c]))] = dict(zip(["accept", "call"], (self.sum2[k] / iters).tolist()))
+        return policy
+
+def mccfr_plus_batched(iters, batch=4096, seed=None,
+                       checkpoint=None, checkpoint_every=0, resume=False, warm_start=None,
+                       eval_every=0, callback=None, oracle=False):
+    """
+    mccfr_plus with `batch` deals sampled per step as arrays. All deals of a
+    step play the current strategies; their regret deltas and strategy sums
+    are scatter-added into dense tables (MccfrTables) and then clipped,
+    CFR+ style. Same policy format as mccfr_plus. Every `eval_every`
+    iterations the exact NashConv of the average strategies is printed;
+    `callback(done, tables)` runs after every step. `oracle` is passed to
+    MccfrTables.step.
+    """
+    rng = np.random.default_rng(seed)
+    tables = MccfrTables()
+    done = 0
+    if resume or warm_start:
+        tables, done, meta = MccfrTables.load(checkpoint if resume else warm_start, exact=resume)
+        if resume:
+            rng.bit_generator.state = meta["numpy_rng"]
+    while done < iters:
+        b = min(batch, iters - done)
+        tables.step(b, rng, oracle)
+        prev, done = done, done + b
+        if done * 10 // iters > prev * 10 // iters:
+            print(f"MCCFR+ iter {done}/{iters}")
+        if eval_every and done // eval_every > prev // eval_every:
+            print(f"MCCFR+ iter {done}: NashConv {tables.exploitability()['nash_conv']:.5f}")
+        if checkpoint and checkpoint_every and (done // checkpoint_every > prev // checkpoint_every
+                                                or done == iters):
+            tables.save(checkpoint, done, {"trainer": "mccfr_plus_batched", "batch": batch,
+                                           "numpy_rng": rng.bit_generator.state})
+        # telemetry records land on the first step past each multiple of its interval
+        if telemetry.active.enabled and done // telemetry.active.every > prev // telemetry.active.every:
+            telemetry.active.iteration(done, lambda: {"nash_conv": tables.exploitability()["nash_conv"]},
+                                       force=True)
+        if callback is not None:
+            callback(done, tables)
+    return tables.policy(iters)
+
 if __name__=="__main__":
     p = argparse.ArgumentParser()
     p.add_argument("--iters", type=int, default=500_000)
     p.add_argument("--out-policy", required=True)
+    p.add_argument("--batch", type=int, default=0,
+                   help="deals per vectorized step (mccfr_plus_batched); 0 runs mccfr_plus")
+    p.add_argument("--seed", type=int, default=None)
+    p.add_argument("--checkpoint", help="where to write (and --resume from) training checkpoints")
+    p.add_argument("--checkpoint-every", type=int, default=50_000,
+                   help="iterations between checkpoints (with --checkpoint)")
+    p.add_argument("--resume", action="store_true",
+                   help="continue from --checkpoint, including the RNG state (bit-identical "
+                        "when the checkpointed iteration is a multiple of --batch)")
+    p.add_argument("--warm-start", help="seed regrets from a checkpoint of this game and restart averaging")
+    p.add_argument("--eval-every", type=int, default=0,
+                   help="print the exact NashConv every N iterations (with --batch)")
+    p.add_argument("--oracle", action="store_true",
+                   help="P1 learns from its exact expected claim utilities over P2's hands "
+                        "(against P2's current accept rows) instead of the sampled P2 hand")
+    p.add_argument("--telemetry", help="write phase timers, counters and convergence metrics (JSON lines)")
+    p.add_argument("--telemetry-every", type=int, default=50_000, help="iterations per telemetry record")
     args = p.parse_args()
+    if args.telemetry:
+        telemetry.enable(args.telemetry, args.telemetry_every, run={"script": "mccfr_train", **vars(args)})
 
-    pol = mccfr_plus(args.iters)
+    ck = (args.checkpoint, args.checkpoint_every, args.resume, args.warm_start)
+    start = time.perf_counter()
+    if args.batch:
+        pol = mccfr_plus_batched(args.iters, args.batch, args.seed, *ck, args.eval_every,
+                                 oracle=args.oracle)
+    else:
+        if args.seed is not None:
+            random.seed(args.seed)
+        pol = mccfr_plus(args.iters, *ck, oracle=args.oracle)
+    elapsed = time.perf_counter() - start
+    telemetry.disable()
+    print(f"{args.iters} iterations in {elapsed:.1f}s ({args.iters/elapsed:,.0f} it/s)")
     with open(args.out_policy, "w") as f:
         json.dump(pol, f, indent=2)
     print("Wrote MCCFR+ policy to", args.out_policy)
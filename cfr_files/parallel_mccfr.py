@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+import os, json, time, argparse
+from multiprocessing import Pool
+import numpy as np
+from mccfr_train import MccfrTables
+
+
+def _worker_round(args):
+    # one sync interval of one worker: start from the merged tables, return deltas
+    master, worker, rnd, seed, deals, batch = args
+    tables = master.copy()
+    rng = np.random.default_rng([seed, worker, rnd])
+    done = 0
+    while done < deals:
+        b = min(batch, deals - done)
+        tables.step(b, rng)
+        done += b
+    deltas = {f: getattr(tables, f) - getattr(master, f) for f in ("reg1", "sum1", "reg2", "sum2")}
+    return deltas, tables.seen1, tables.seen2
+
+
+def parallel_mccfr_plus(iters, workers=4, sync_interval=100_000, batch=4096, seed=0, on_round=None):
+    """
+    Batched MCCFR+ over a pool of worker processes. Every round each worker
+    plays `sync_interval` deals from its own stream (seeded by seed, worker
+    and round, so runs are reproducible) against a copy of the merged
+    tables; the parent then sums their regret and strategy-sum deltas into
+    the merged tables and clips regrets, CFR+ style. `on_round(tables, done)`
+    is called after each merge and stops training early by returning True.
+    Returns the merged MccfrTables.
+    """
+    tables = MccfrTables()
+    done, rnd = 0, 0
+    with Pool(workers) as pool:
+        while done < iters:
+            per_worker = [min(sync_interval, max(iters - done - w * sync_interval, 0))
+                          for w in range(workers)]
+            jobs = [(tables, w, rnd, seed, n, batch) for w, n in enumerate(per_worker) if n > 0]
+            for deltas, seen1, seen2 in pool.map(_worker_round, jobs):
+                for f, d in deltas.items():
+                    getattr(tables, f)[...] += d
+                tables.seen1 |= seen1
+                tables.seen2 |= seen2
+            np.maximum(tables.reg1, 0.0, out=tables.reg1)
+            np.maximum(tables.reg2, 0.0, out=tables.reg2)
+            done += sum(per_worker)
+            rnd += 1
+            if on_round is not None and on_round(tables, done):
+                break
+    return tables
+
+
+def scaling_report(worker_counts, seconds, sync_interval, batch, seed, report_path):
+    """
+    For each worker count, train for `seconds` of wall-clock time and log
+    iterations/sec and the saddle-point gap (NashConv) of the average
+    strategies (exact, via MccfrTables.exploitability) after every merge.
+    Evaluation time is excluded from the training clock.
+    """
+    rows = []
+    with open(report_path, "w") as out:
+        for workers in worker_counts:
+            clock = {"train": 0.0, "mark": time.perf_counter()}
+
+            def on_round(tables, done):
+                clock["train"] += time.perf_counter() - clock["mark"]
+                row = {"workers": workers, "iters": done, "seconds": clock["train"],
+                       "it_per_sec": done / clock["train"],
+                       "nash_conv": tables.exploitability()["nash_conv"]}
+                out.write(json.dumps(row) + "\n")
+                rows.append(row)
+                clock["mark"] = time.perf_counter()
+                return clock["train"] >= seconds
+
+            parallel_mccfr_plus(float("inf"), workers, sync_interval, batch, seed, on_round)
+            last = rows[-1]
+            print(f"{workers:>3} workers: {last['it_per_sec']:>12,.0f} it/s   "
+                  f"{last['iters']:>11,} iters in {last['seconds']:5.1f}s   "
+                  f"NashConv {last['nash_conv']:.4f}")
+    return rows
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Parallel batched MCCFR+ for the quantity/face game")
+    p.add_argument("--iters", type=int, default=10_000_000)
+    p.add_argument("--workers", type=int, default=os.cpu_count())
+    p.add_argument("--sync-interval", type=int, default=100_000,
+                   help="deals each worker plays between merges")
+    p.add_argument("--batch", type=int, default=4096)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out-policy")
+    p.add_argument("--scaling", help="comma-separated worker counts, e.g. 1,2,4,8,16")
+    p.add_argument("--seconds", type=float, default=30.0, help="training time per worker count")
+    p.add_argument("--report", default="mccfr_scaling.jsonl")
+    args = p.parse_args()
+
+    if args.scaling:
+        counts = [int(w) for w in args.scaling.split(",")]
+        scaling_report(counts, args.seconds, args.sync_interval, args.batch, args.seed, args.report)
+        print("Wrote scaling report to", args.report)
+    else:
+        start = time.perf_counter()
+        tables = parallel_mccfr_plus(args.iters, args.workers, args.sync_interval, args.batch, args.seed)
+        elapsed = time.perf_counter() - start
+        print(f"{args.iters} iterations on {args.workers} workers in {elapsed:.1f}s "
+              f"({args.iters/elapsed:,.0f} it/s)")
+        if args.out_policy:
+            with open(args.out_policy, "w") as f:
+                json.dump(tables.policy(args.iters), f, indent=2)
+            print("Wrote MCCFR+ policy to", args.out_policy)
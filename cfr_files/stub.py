@@ -3,7 +3,12 @@
 import os
 import argparse
 import json
-import matplotlib.pyplot as plt
+import numpy as np
+from compiled_game import compile_game
+from binary_game import is_binary_game, load_binary_game
+from vector_cfr import VectorCfr
+import telemetry
+import game_cache
 
 ###############################################################################
 # The next functions are already implemented for your convenience
@@ -28,6 +33,10 @@ def is_valid_RSigma_vector(tfsdp, obj):
     return isinstance(obj, dict) and obj.keys() == sequence_set
 
 def assert_is_valid_sf_strategy(tfsdp, obj):
+    with telemetry.active.phase("assert_sf"):
+        _assert_is_valid_sf_strategy(tfsdp, obj)
+
+def _assert_is_valid_sf_strategy(tfsdp, obj):
     if not is_valid_RSigma_vector(tfsdp, obj):
         print("The sequence-form strategy should be a dictionary with key set equal to the set of sequences in the game")
         os.exit(1)
@@ -51,21 +60,31 @@ def best_response_value(tfsdp, utility):
 
 def compute_utility_vector_pl1(game, sf_strategy_pl2):
     assert_is_valid_sf_strategy(game["decision_problem_pl2"], sf_strategy_pl2)
-    seqs = get_sequence_set(game["decision_problem_pl1"])
-    utility = {s: 0.0 for s in seqs}
-    for e in game["utility_pl1"]:
-        utility[e["sequence_pl1"]] += e["value"] * sf_strategy_pl2[e["sequence_pl2"]]
-    assert is_valid_RSigma_vector(game["decision_problem_pl1"], utility)
-    return utility
+    with telemetry.active.phase("utility_pl1"):
+        if "compiled" in game:
+            telemetry.active.count("entries_scanned", len(game["compiled"].values))
+            return game["compiled"].utility_vector_pl1(sf_strategy_pl2)
+        telemetry.active.count("entries_scanned", len(game["utility_pl1"]))
+        seqs = get_sequence_set(game["decision_problem_pl1"])
+        utility = {s: 0.0 for s in seqs}
+        for e in game["utility_pl1"]:
+            utility[e["sequence_pl1"]] += e["value"] * sf_strategy_pl2[e["sequence_pl2"]]
+        assert is_valid_RSigma_vector(game["decision_problem_pl1"], utility)
+        return utility
 
 def compute_utility_vector_pl2(game, sf_strategy_pl1):
     assert_is_valid_sf_strategy(game["decision_problem_pl1"], sf_strategy_pl1)
-    seqs = get_sequence_set(game["decision_problem_pl2"])
-    utility = {s: 0.0 for s in seqs}
-    for e in game["utility_pl1"]:
-        utility[e["sequence_pl2"]] -= e["value"] * sf_strategy_pl1[e["sequence_pl1"]]
-    assert is_valid_RSigma_vector(game["decision_problem_pl2"], utility)
-    return utility
+    with telemetry.active.phase("utility_pl2"):
+        if "compiled" in game:
+            telemetry.active.count("entries_scanned", len(game["compiled"].values))
+            return game["compiled"].utility_vector_pl2(sf_strategy_pl1)
+        telemetry.active.count("entries_scanned", len(game["utility_pl1"]))
+        seqs = get_sequence_set(game["decision_problem_pl2"])
+        utility = {s: 0.0 for s in seqs}
+        for e in game["utility_pl1"]:
+            utility[e["sequence_pl2"]] -= e["value"] * sf_strategy_pl1[e["sequence_pl1"]]
+        assert is_valid_RSigma_vector(game["decision_problem_pl2"], utility)
+        return utility
 
 def gap(game, sf1, sf2):
     assert_is_valid_sf_strategy(game["decision_problem_pl1"], sf1)
@@ -88,6 +107,75 @@ def compute_opponent_reach(tfsdp, opp_strat, target_id):
         node = parent
     return reach
 
+class TreeIndex:
+    """
+    Parent pointers, child lists and a depth (top-down) order for one tfsdp,
+    built once per game so that reach probabilities for every node can be
+    computed in a single pass instead of one root walk per infoset.
+    """
+    def __init__(self, tfsdp):
+        self.nodes = {n["id"]: n for n in tfsdp}
+        self.parent = {n["id"]: n["parent_edge"] for n in tfsdp}
+        self.children = {n["id"]: [] for n in tfsdp}
+        roots = []
+        for n in tfsdp:
+            if n["parent_edge"] is None:
+                roots.append(n["id"])
+            else:
+                pid, sig = n["parent_edge"]
+                self.children[pid].append((sig, n["id"]))
+        # breadth-first from the roots: every parent precedes its children
+        self.order = list(roots)
+        for nid in self.order:
+            self.order.extend(c for _, c in self.children[nid])
+
+    def opponent_reach(self, opp_strat):
+        # same product as compute_opponent_reach, for every node at once
+        reach = {nid: 1.0 for nid in self.order if self.parent[nid] is None}
+        for nid in self.order:
+            r = reach[nid]
+            observation = self.nodes[nid]["type"] == "observation"
+            for sig, child in self.children[nid]:
+                key = (nid, sig)
+                reach[child] = r * opp_strat[key] if observation and key in opp_strat else r
+        return reach
+
+def load_game(path, compiled=False, cache=True):
+    """
+    Read a game json and convert list→tuple for sequences/edges.
+    With `compiled=True` the game also carries an integer-indexed
+    `CompiledGame` under game["compiled"], which the utility helpers use.
+    Binary game stores (see binary_game.py) are always loaded compiled and
+    memory-mapped. With `cache` the preprocessed game is kept in a
+    content-hashed pickle next to the json (game_cache.py).
+    """
+    if is_binary_game(path):
+        return load_binary_game(path)
+    with open(path, "rb") as f:
+        raw = f.read()
+    game = game_cache.load(path, raw) if cache else None
+    if game is None:
+        game = json.loads(raw)
+        for tfsdp in (game["decision_problem_pl1"], game["decision_problem_pl2"]):
+            for node in tfsdp:
+                if isinstance(node.get("parent_edge"), list):
+                    node["parent_edge"] = tuple(node["parent_edge"])
+                if isinstance(node.get("parent_sequence"), list):
+                    node["parent_sequence"] = tuple(node["parent_sequence"])
+        for entry in game["utility_pl1"]:
+            entry["sequence_pl1"] = tuple(entry["sequence_pl1"])
+            entry["sequence_pl2"] = tuple(entry["sequence_pl2"])
+        if compiled:
+            compile_game(game)
+        if cache:
+            game_cache.store(path, raw, game)
+    elif compiled and "compiled" not in game:
+        compile_game(game)
+        game_cache.store(path, raw, game)
+    if not compiled:
+        game.pop("compiled", None)
+    return game
+
 ###############################################################################
 # Fill in the implementations below
 ###############################################################################
@@ -139,11 +227,37 @@ class RegretMatchingPlus(RegretMatching):
         for a in self.actions:
             self.regrets[a] = max(0.0, self.regrets[a] + u[a] - ev)
 
+class DiscountedRegretMatching(RegretMatching):
+    """
+    Discounted CFR's local update: after the t-th observation positive
+    regrets are scaled by t^alpha/(t^alpha+1), negative ones by
+    t^beta/(t^beta+1).
+    """
+    def __init__(self, actions, alpha=1.5, beta=0.0):
+        super().__init__(actions)
+        self.alpha, self.beta = alpha, beta
+        self.t = 0
+    def observe_utility(self, u):
+        super().observe_utility(u)
+        self.t += 1
+        pos, neg = self.t**self.alpha, self.t**self.beta
+        for a in self.actions:
+            r = self.regrets[a]
+            self.regrets[a] = r * (pos/(pos+1) if r > 0 else neg/(neg+1))
+
+class LinearRegretMatching(DiscountedRegretMatching):
+    # Linear CFR: the t-th observation weighted by t (DCFR with alpha = beta = 1)
+    def __init__(self, actions):
+        super().__init__(actions, alpha=1.0, beta=1.0)
+
 class Cfr:
     def __init__(self, tfsdp, rm_class=RegretMatching):
         self.tfsdp = tfsdp
         self.local = {n["id"]: rm_class(n["actions"]) for n in tfsdp if n["type"]=="decision"}
     def next_strategy(self):
+        with telemetry.active.phase("next_strategy"):
+            return self._next_strategy()
+    def _next_strategy(self):
         strat = {}
         for n in self.tfsdp:
             if n["type"]!="decision": continue
@@ -153,126 +267,207 @@ class Cfr:
                 strat[(n["id"],a)] = parent_p*local[a]
         return strat
     def observe_utility(self, util):
-        for n in self.tfsdp:
+        with telemetry.active.phase("regret_update"):
+            telemetry.active.count("infosets_touched", len(self.local))
+            self._observe_utility(util)
+    def _observe_utility(self, util):
+        # counterfactual values: each sequence's utility plus the value of
+        # the decision nodes below it under the current strategy (bottom-up)
+        cfv = dict(util)
+        cfv[None] = 0.0
+        for n in reversed(self.tfsdp):
             if n["type"]!="decision": continue
-            u_loc = {a:util[(n["id"],a)] for a in n["actions"]}
-            self.local[n["id"]].observe_utility(u_loc)
+            rm = self.local[n["id"]]
+            u_loc = {a:cfv[(n["id"],a)] for a in n["actions"]}
+            rm.observe_utility(u_loc)
+            cfv[n["parent_sequence"]] += sum(rm.last_strat[a]*u_loc[a] for a in n["actions"])
 
 def solve_problem_3_1(game):
     uniform2 = uniform_sf_strategy(game["decision_problem_pl2"])
     u = compute_utility_vector_pl1(game, uniform2)
     print("Exact best-response value:", best_response_value(game["decision_problem_pl1"], u))
 
-def solve_problem_3_2(game):
+def solve_problem_3_2(game, engine="dict", iters=1000, callback=None):
+    """
+    `callback(t, average)` runs after every iteration; average() returns the
+    current average sf strategies. Returns the final averages.
+    """
+    if engine == "vector":
+        return solve_problem_3_2_vector(game, iters, callback)
     c1 = Cfr(game["decision_problem_pl1"], rm_class=RegretMatching)
     c2 = Cfr(game["decision_problem_pl2"], rm_class=RegretMatching)
+    idx1 = TreeIndex(game["decision_problem_pl1"])
+    idx2 = TreeIndex(game["decision_problem_pl2"])
     seq1 = get_sequence_set(game["decision_problem_pl1"])
     seq2 = get_sequence_set(game["decision_problem_pl2"])
     cum1 = {s:0.0 for s in seq1}
     cum2 = {s:0.0 for s in seq2}
-    iters = 1000
     for t in range(1, iters+1):
         x = c1.next_strategy()
         y = c2.next_strategy()
-        for s in seq1: cum1[s]+=x[s]
-        for s in seq2: cum2[s]+=y[s]
-        avg1 = {s:cum1[s]/t for s in seq1}
-        avg2 = {s:cum2[s]/t for s in seq2}
+        with telemetry.active.phase("averaging"):
+            for s in seq1: cum1[s]+=x[s]
+            for s in seq2: cum2[s]+=y[s]
+            avg1 = {s:cum1[s]/t for s in seq1}
+            avg2 = {s:cum2[s]/t for s in seq2}
         u1 = compute_utility_vector_pl1(game, y)
         u2 = compute_utility_vector_pl2(game, x)
+        reach1 = idx1.opponent_reach(y)
+        reach2 = idx2.opponent_reach(x)
         # P1 CFR update
         for n in game["decision_problem_pl1"]:
             if n["type"]!="decision": continue
             I=n["id"]
             local_u={a:u1[(I,a)] for a in n["actions"]}
-            reach=compute_opponent_reach(game["decision_problem_pl1"], y, I)
+            reach=reach1[I]
             c1.local[I].observe_utility({a:reach*local_u[a] for a in local_u})
         # P2 CFR update
         for n in game["decision_problem_pl2"]:
             if n["type"]!="decision": continue
             J=n["id"]
             local_u={a:u2[(J,a)] for a in n["actions"]}
-            reach=compute_opponent_reach(game["decision_problem_pl2"], x, J)
+            reach=reach2[J]
             c2.local[J].observe_utility({a:reach*local_u[a] for a in local_u})
+        telemetry.active.iteration(t, lambda: {"gap": gap(game, avg1, avg2)})
+        if callback is not None:
+            callback(t, lambda: (avg1, avg2))
     print("Final saddle point gap:", gap(game, avg1, avg2))
     print("Final expected utility for Player 1:", expected_utility_pl1(game, avg1, avg2))
+    return avg1, avg2
 
-def solve_problem_3_3(game):
+def solve_problem_3_3(game, engine="dict", iters=5000, callback=None):
+    # same `callback` and return value as solve_problem_3_2
+    if engine == "vector":
+        return solve_problem_3_3_vector(game, iters, callback)
     c1 = Cfr(game["decision_problem_pl1"], rm_class=RegretMatchingPlus)
     c2 = Cfr(game["decision_problem_pl2"], rm_class=RegretMatchingPlus)
+    idx1 = TreeIndex(game["decision_problem_pl1"])
+    idx2 = TreeIndex(game["decision_problem_pl2"])
     seq1 = get_sequence_set(game["decision_problem_pl1"])
     seq2 = get_sequence_set(game["decision_problem_pl2"])
     wc1 = {s:0.0 for s in seq1}
     wc2 = {s:0.0 for s in seq2}
-    iters=5000
     x_cur = c1.next_strategy()
     for t in range(1, iters+1):
         y_cur = c2.next_strategy()
-        for s in seq1: wc1[s]+=t*x_cur[s]
-        for s in seq2: wc2[s]+=t*y_cur[s]
-        total = t*(t+1)/2
-        avg1 = {s:wc1[s]/total for s in seq1}
-        avg2 = {s:wc2[s]/total for s in seq2}
+        with telemetry.active.phase("averaging"):
+            for s in seq1: wc1[s]+=t*x_cur[s]
+            for s in seq2: wc2[s]+=t*y_cur[s]
+            total = t*(t+1)/2
+            avg1 = {s:wc1[s]/total for s in seq1}
+            avg2 = {s:wc2[s]/total for s in seq2}
         u1 = compute_utility_vector_pl1(game, y_cur)
+        reach1 = idx1.opponent_reach(y_cur)
         # CFR+ P1 update
         for n in game["decision_problem_pl1"]:
             if n["type"]!="decision": continue
             I=n["id"]
             local_u={a:u1[(I,a)] for a in n["actions"]}
-            reach=compute_opponent_reach(game["decision_problem_pl1"], y_cur, I)
+            reach=reach1[I]
             c1.local[I].observe_utility({a:reach*local_u[a] for a in local_u})
         # CFR+ P2 update (uses next x)
         x_next = c1.next_strategy()
         u2 = compute_utility_vector_pl2(game, x_next)
+        reach2 = idx2.opponent_reach(x_next)
         for n in game["decision_problem_pl2"]:
             if n["type"]!="decision": continue
             J=n["id"]
             local_u={a:u2[(J,a)] for a in n["actions"]}
-            reach=compute_opponent_reach(game["decision_problem_pl2"], x_next, J)
+            reach=reach2[J]
             c2.local[J].observe_utility({a:reach*local_u[a] for a in local_u})
         x_cur = x_next
+        telemetry.active.iteration(t, lambda: {"gap": gap(game, avg1, avg2)})
+        if callback is not None:
+            callback(t, lambda: (avg1, avg2))
 
     # **finally** print the results
     print("Final saddle point gap (CFR+):", gap(game, avg1, avg2))
     print("Final expected utility for Player 1 (CFR+):", expected_utility_pl1(game, avg1, avg2))
+    return avg1, avg2
+
+###############################################################################
+# Same loops on the batched engine (vector_cfr.VectorCfr): strategies,
+# utilities and regrets are flat arrays indexed by game["compiled"]
+###############################################################################
+
+def solve_problem_3_2_vector(game, iters=1000, callback=None):
+    cg = game["compiled"] if "compiled" in game else compile_game(game)["compiled"]
+    c1 = VectorCfr(cg.pl1)
+    c2 = VectorCfr(cg.pl2)
+    cum1 = np.zeros(cg.pl1.size)
+    cum2 = np.zeros(cg.pl2.size)
+    for t in range(1, iters+1):
+        x = c1.next_strategy()
+        y = c2.next_strategy()
+        cum1 += x
+        cum2 += y
+        u1 = cg.utility_pl1(y)
+        u2 = cg.utility_pl2(x)
+        c1.observe_local_utility(cg.opponent_reach_pl1(y)[cg.pl1.seg] * u1)
+        c2.observe_local_utility(cg.opponent_reach_pl2(x)[cg.pl2.seg] * u2)
+        average = lambda: (cg.pl1.to_dict(cum1 / t), cg.pl2.to_dict(cum2 / t))
+        telemetry.active.iteration(t, lambda: {"gap": gap(game, *average())})
+        if callback is not None:
+            callback(t, average)
+    avg1 = cg.pl1.to_dict(cum1 / iters)
+    avg2 = cg.pl2.to_dict(cum2 / iters)
+    print("Final saddle point gap:", gap(game, avg1, avg2))
+    print("Final expected utility for Player 1:", expected_utility_pl1(game, avg1, avg2))
+    return avg1, avg2
+
+def solve_problem_3_3_vector(game, iters=5000, callback=None):
+    cg = game["compiled"] if "compiled" in game else compile_game(game)["compiled"]
+    c1 = VectorCfr(cg.pl1, plus=True)
+    c2 = VectorCfr(cg.pl2, plus=True)
+    wc1 = np.zeros(cg.pl1.size)
+    wc2 = np.zeros(cg.pl2.size)
+    x_cur = c1.next_strategy()
+    for t in range(1, iters+1):
+        y_cur = c2.next_strategy()
+        wc1 += t * x_cur
+        wc2 += t * y_cur
+        u1 = cg.utility_pl1(y_cur)
+        c1.observe_local_utility(cg.opponent_reach_pl1(y_cur)[cg.pl1.seg] * u1)
+        x_next = c1.next_strategy()
+        u2 = cg.utility_pl2(x_next)
+        c2.observe_local_utility(cg.opponent_reach_pl2(x_next)[cg.pl2.seg] * u2)
+        x_cur = x_next
+        w = t*(t+1)/2
+        average = lambda: (cg.pl1.to_dict(wc1 / w), cg.pl2.to_dict(wc2 / w))
+        telemetry.active.iteration(t, lambda: {"gap": gap(game, *average())})
+        if callback is not None:
+            callback(t, average)
+    total = iters*(iters+1)/2
+    avg1 = cg.pl1.to_dict(wc1 / total)
+    avg2 = cg.pl2.to_dict(wc2 / total)
+    print("Final saddle point gap (CFR+):", gap(game, avg1, avg2))
+    print("Final expected utility for Player 1 (CFR+):", expected_utility_pl1(game, avg1, avg2))
+    return avg1, avg2
 
 if __name__ == "__main__":
 
     p = argparse.ArgumentParser(description="Problem 3 (CFR)")
     p.add_argument("--game",    required=True, help="Path to game file")
     p.add_argument("--problem", choices=["3.1","3.2","3.3"], required=True)
+    p.add_argument("--compiled", action="store_true",
+                   help="compute utility vectors with the integer-indexed sparse game")
+    p.add_argument("--engine", choices=["dict","vector"], default="dict",
+                   help="per-infoset RegretMatching objects or the batched VectorCfr engine")
+    p.add_argument("--telemetry", help="write phase timers, counters and convergence metrics (JSON lines)")
+    p.add_argument("--telemetry-every", type=int, default=100, help="iterations per telemetry record")
     args = p.parse_args()
+    if args.telemetry:
+        telemetry.enable(args.telemetry, args.telemetry_every, run={"script": "stub", **vars(args)})
 
     print(f"Reading game path {args.game}...")
 
-    game = json.load(open(args.game))
-    for tfsdp in (game["decision_problem_pl1"], game["decision_problem_pl2"]):
-        for node in tfsdp:
-            if isinstance(node.get("parent_edge"), list):
-                node["parent_edge"] = tuple(node["parent_edge"])
-            if "parent_sequence" in node and isinstance(node.get("parent_sequence"), list):
-                node["parent_sequence"] = tuple(node["parent_sequence"])
-
-        # tuplify every sequence_pl1 / sequence_pl2 in the utility list
-    for entry in game["utility_pl1"]:
-        entry["sequence_pl1"] = tuple(entry["sequence_pl1"])
-        entry["sequence_pl2"] = tuple(entry["sequence_pl2"])
-
-    # convert list→tuple for sequences/edges
-    for tfsdp in (game["decision_problem_pl1"], game["decision_problem_pl2"]):
-        for n in tfsdp:
-            if isinstance(n.get("parent_edge"), list):
-                n["parent_edge"] = tuple(n["parent_edge"])
-            if "parent_sequence" in n and isinstance(n.get("parent_sequence"), list):
-                n["parent_sequence"] = tuple(n["parent_sequence"])
-    for e in game["utility_pl1"]:
-        e["sequence_pl1"] = tuple(e["sequence_pl1"])
-        e["sequence_pl2"] = tuple(e["sequence_pl2"])
+    game = load_game(args.game, compiled=args.compiled)
 
     print(f"... done. Running code for Problem {args.problem}")
     if args.problem == "3.1":
         solve_problem_3_1(game)
     elif args.problem == "3.2":
-        solve_problem_3_2(game)
+        solve_problem_3_2(game, args.engine)
     else:
-        solve_problem_3_3(game)
+        solve_problem_3_3(game, args.engine)
+    telemetry.disable()
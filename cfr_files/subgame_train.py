@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Solve the one-turn quantity/face game for every dice-count state of a
+match: the claimant holds n1 dice, the responder n2, for all n1, n2 in
+1..max_dice. Subgames are independent, so they are solved on a process
+pool, each with full-width CFR+ (alternating updates, linear averaging)
+on the multiset game, where both players' utilities are tail sums over
+the opponent's face counts (exploitability.QuantityFaceGame). Every
+--eval-every iterations the exact NashConv is checked against --target.
+
+All subgames go into one .npz artifact:
+    index              json: max_face, claims, and per subgame n1, n2,
+                       iterations, seconds, nash_conv, value
+    claims_{n1}x{n2}   float32 [hands of n1 dice, claims]   claimant's strategy
+    accept_{n1}x{n2}   float32 [hands of n2 dice, claims]   responder's P(accept)
+Hands are sorted multisets in combinations_with_replacement order; claims
+are the claim_Q_F list up to Q = 2 * max_dice, with claims beyond
+n1 + n2 dice never made and always called. Read it with
+cfr_web/policy_store.SubgameStore.
+
+    python subgame_train.py --out ../policies/liarsdice_subgames.npz --workers 8
+"""
+import os, json, time, argparse
+from multiprocessing import Pool
+import numpy as np
+from exploitability import QuantityFaceGame
+
+
+def _regret_matching(reg):
+    pos = np.maximum(reg, 0.0)
+    tot = pos.sum(axis=-1, keepdims=True)
+    return np.where(tot > 0, pos / np.where(tot > 0, tot, 1.0), 1.0 / reg.shape[-1])
+
+
+def solve_subgame(n1, n2, iters=2000, max_face=6, target=1e-3, eval_every=100, seconds=None):
+    """
+    CFR+ on the (n1, n2) one-turn game until the NashConv of the average
+    strategies is below `target`, or after `iters` iterations or `seconds`.
+    Returns the average strategies (strat1 [hands1, claims], accept2
+    [hands2, claims]) and run statistics; evaluation is not timed.
+    """
+    game = QuantityFaceGame(n1, max_face, n2)
+    p1, p2 = game.hand_p[:, None], game.hand_p2[:, None]
+    reg1 = np.zeros((len(game.hands), len(game.claims)))
+    reg2 = np.zeros((len(game.hands2), len(game.claims), 2))
+    sum1, sum2 = np.zeros_like(reg1), np.zeros(reg2.shape[:2])
+    clock, t, stats = 0.0, 0, {}
+    while t < iters:
+        mark = time.perf_counter()
+        t += 1
+        # P1 against P2's current accept probabilities
+        accept = _regret_matching(reg2)[..., 0]
+        x = _regret_matching(reg1)
+        u1 = p1 * game.claim_payoff(p2 * (2 * accept - 1), weights_of=2)
+        reg1 += u1 - (x * u1).sum(axis=1, keepdims=True)
+        np.maximum(reg1, 0.0, out=reg1)
+        # P2 against P1's updated strategy: accepting earns -payoff, calling +payoff
+        x_next = _regret_matching(reg1)
+        v = p2 * game.claim_payoff(p1 * x_next, weights_of=1)
+        ev = (2 * accept - 1) * -v
+        reg2[..., 0] += -v - ev
+        reg2[..., 1] += v - ev
+        np.maximum(reg2, 0.0, out=reg2)
+        sum1 += t * x
+        sum2 += t * accept
+        clock += time.perf_counter() - mark
+        if t % eval_every == 0 or t == iters or (seconds and clock >= seconds):
+            norm = t * (t + 1) / 2
+            stats = game.exploitability(sum1 / norm, sum2 / norm)
+            if stats["nash_conv"] <= target or (seconds and clock >= seconds):
+                break
+    norm = t * (t + 1) / 2
+    return {"n1": n1, "n2": n2, "iterations": t, "seconds": clock,
+            "nash_conv": stats["nash_conv"], "value": stats["value"],
+            "strat1": sum1 / norm, "accept2": sum2 / norm, "claims": game.claims}
+
+
+def _solve(args):
+    return solve_subgame(*args)
+
+
+def train_subgames(max_dice=5, max_face=6, iters=2000, target=1e-3, eval_every=100,
+                   seconds=None, workers=None):
+    """Solve every (n1, n2) subgame on `workers` processes; returns results sorted by (n1, n2)."""
+    jobs = [(n1, n2, iters, max_face, target, eval_every, seconds)
+            for n1 in range(1, max_dice + 1) for n2 in range(1, max_dice + 1)]
+    # largest subgames first, so the pool does not finish on a straggler
+    jobs.sort(key=lambda j: -(j[0] + j[1]) * max(j[0], j[1]))
+    with Pool(workers or os.cpu_count()) as pool:
+        results = list(pool.imap_unordered(_solve, jobs))
+    return sorted(results, key=lambda r: (r["n1"], r["n2"]))
+
+
+def save_subgames(path, results, max_dice, max_face, meta=None):
+    claims = [f"claim_{Q}_{F}" for Q in range(1, 2*max_dice+1) for F in range(1, max_face+1)]
+    arrays, index = {}, []
+    for r in results:
+        key = f"{r['n1']}x{r['n2']}"
+        k = len(r["claims"])        # the subgame's claims are a prefix of the full list
+        s1 = np.zeros((len(r["strat1"]), len(claims)), dtype=np.float32)
+        s1[:, :k] = r["strat1"]
+        a2 = np.zeros((len(r["accept2"]), len(claims)), dtype=np.float32)
+        a2[:, :k] = r["accept2"]
+        arrays[f"claims_{key}"], arrays[f"accept_{key}"] = s1, a2
+        index.append({f: r[f] for f in ("n1", "n2", "iterations", "seconds", "nash_conv", "value")})
+    header = {"max_dice": max_dice, "max_face": max_face, "claims": claims, "subgames": index, **(meta or {})}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, index=np.array(json.dumps(header)), **arrays)
+    os.replace(tmp, path)
+
+
+def budget_report(results, wall, workers):
+    print(f"{'subgame':<9}{'iters':>7}{'seconds':>9}{'NashConv':>11}{'P1 value':>10}")
+    for r in results:
+        print(f"{r['n1']}x{r['n2']:<7}{r['iterations']:>7}{r['seconds']:>9.2f}"
+              f"{r['nash_conv']:>11.2e}{r['value']:>+10.4f}")
+    cpu = sum(r["seconds"] for r in results)
+    slowest = max(results, key=lambda r: r["seconds"])
+    print(f"{len(results)} subgames, {sum(r['iterations'] for r in results):,} iterations: "
+          f"{cpu:.1f}s of solver time in {wall:.1f}s wall on {workers} workers "
+          f"({cpu / wall:.1f}x parallel); slowest {slowest['n1']}x{slowest['n2']} "
+          f"{slowest['seconds']:.1f}s; worst NashConv {max(r['nash_conv'] for r in results):.2e}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Train a policy for every (claimant dice, responder dice) subgame")
+    p.add_argument("--out", required=True, help="multi-subgame policy artifact (.npz)")
+    p.add_argument("--max-dice", type=int, default=5)
+    p.add_argument("--max-face", type=int, default=6)
+    p.add_argument("--iters", type=int, default=2000, help="iteration cap per subgame")
+    p.add_argument("--target", type=float, default=1e-3, help="stop a subgame once its NashConv is below")
+    p.add_argument("--eval-every", type=int, default=100)
+    p.add_argument("--seconds", type=float, default=None, help="solver time cap per subgame")
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    args = p.parse_args()
+
+    workers = args.workers or os.cpu_count()
+    start = time.perf_counter()
+    results = train_subgames(args.max_dice, args.max_face, args.iters, args.target,
+                             args.eval_every, args.seconds, workers)
+    wall = time.perf_counter() - start
+    budget_report(results, wall, workers)
+    save_subgames(args.out, results, args.max_dice, args.max_face,
+                  {"trainer": "subgame_train", "target": args.target, "wall_seconds": wall})
+    print("Wrote", args.out)
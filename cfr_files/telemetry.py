@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Opt-in run telemetry for the training loops. Instrumented code calls
+
+    with telemetry.active.phase("utility_pl1"): ...
+    telemetry.active.count("entries_scanned", n)
+    telemetry.active.iteration(t, metrics)
+
+which are no-ops until enable(path) installs a Telemetry; then phase times,
+call counts and counters are accumulated and written as one JSON line per
+`every` iterations, together with `metrics()` (convergence metrics such as
+the saddle-point gap, only computed when a record is written).
+
+    python telemetry.py run.jsonl        # summarize a run's log
+"""
+import json
+import time
+import argparse
+from contextlib import contextmanager, nullcontext
+from collections import defaultdict
+
+
+class Telemetry:
+    enabled = True
+
+    def __init__(self, path, every=100, run=None):
+        self.out = open(path, "w")
+        self.every = max(every, 1)
+        self.start = self.mark = time.perf_counter()
+        self._reset()
+        self.emit("start", run=run or {})
+
+    def _reset(self):
+        self.seconds = defaultdict(float)
+        self.calls = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def phase(self, name):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] += time.perf_counter() - t
+            self.calls[name] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def emit(self, event, **fields):
+        self.out.write(json.dumps({"event": event, "elapsed": time.perf_counter() - self.start, **fields}) + "\n")
+
+    def iteration(self, t, metrics=None, force=False):
+        # write the interval record every `every` iterations (or when forced)
+        if not force and t % self.every:
+            return
+        now = time.perf_counter()
+        self.emit("interval", iteration=t, wall=now - self.mark,
+                  phases={k: {"seconds": v, "calls": self.calls[k]} for k, v in self.seconds.items()},
+                  counters=dict(self.counters),
+                  metrics=metrics() if metrics is not None else {})
+        self.out.flush()
+        self._reset()
+        # metric evaluation is not charged to the next interval
+        self.mark = time.perf_counter()
+
+    def close(self):
+        self.emit("end")
+        self.out.close()
+
+
+class _Disabled:
+    enabled = False
+    _null = nullcontext()
+
+    def phase(self, name):
+        return self._null
+
+    def count(self, name, n=1):
+        pass
+
+    def emit(self, event, **fields):
+        pass
+
+    def iteration(self, t, metrics=None, force=False):
+        pass
+
+    def close(self):
+        pass
+
+
+DISABLED = _Disabled()
+active = DISABLED
+
+
+def enable(path, every=100, run=None):
+    global active
+    active = Telemetry(path, every, run)
+    return active
+
+
+def disable():
+    global active
+    active.close()
+    active = DISABLED
+
+
+def summarize(path):
+    """Totals per phase and counter, plus the first and last convergence metrics."""
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    run = next((r["run"] for r in records if r["event"] == "start"), {})
+    intervals = [r for r in records if r["event"] == "interval"]
+    wall = sum(r["wall"] for r in intervals)
+    seconds, calls, counters = defaultdict(float), defaultdict(int), defaultdict(int)
+    for r in intervals:
+        for k, v in r["phases"].items():
+            seconds[k] += v["seconds"]
+            calls[k] += v["calls"]
+        for k, v in r["counters"].items():
+            counters[k] += v
+    iters = intervals[-1]["iteration"] if intervals else 0
+
+    print(f"{path}: {json.dumps(run)}")
+    print(f"{iters} iterations, {wall:.2f}s in the loop ({iters / wall if wall else 0:,.1f} it/s)")
+    print(f"{'phase':<22}{'seconds':>10}{'% loop':>8}{'calls':>12}{'us/call':>10}")
+    for k in sorted(seconds, key=seconds.get, reverse=True):
+        print(f"{k:<22}{seconds[k]:>10.3f}{100 * seconds[k] / wall if wall else 0:>7.1f}%"
+              f"{calls[k]:>12,}{1e6 * seconds[k] / calls[k]:>10.1f}")
+    for k, v in sorted(counters.items()):
+        print(f"{k:<22}{v:>14,}  ({v / iters if iters else 0:,.1f} per iteration)")
+    with_metrics = [r for r in intervals if r["metrics"]]
+    if with_metrics:
+        first, last = with_metrics[0], with_metrics[-1]
+        for k in last["metrics"]:
+            print(f"{k:<22}{first['metrics'].get(k, float('nan')):>14.6g} @ {first['iteration']}"
+                  f"  ->  {last['metrics'][k]:.6g} @ {last['iteration']}")
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Summarize a telemetry JSON-lines log")
+    p.add_argument("log")
+    summarize(p.parse_args().log)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+import numpy as np
+import telemetry
+
+
+class VectorCfr:
+    """
+    Batched counterpart of stub.Cfr over a compiled SequenceSpace.
+    All regrets live in one flat array; each decision node owns the segment
+    starts[i]:starts[i+1], so regret matching, the CFR+ clipping and the
+    top-down sequence-form build are whole-array operations.
+    """
+    def __init__(self, space, plus=False):
+        self.space = space
+        self.plus = plus
+        self.regrets = np.zeros(space.size)
+        self.seg_sizes = np.diff(space.starts)[space.seg].astype(np.float64)
+        self.last_local = 1.0 / self.seg_sizes
+        self.t = 0
+        # decision nodes owning the sequences of each depth level
+        self.level_infosets = [np.unique(space.seg[lvl]) for lvl in space.levels]
+
+    def _segment_sum(self, v):
+        return np.add.reduceat(v, self.space.starts[:-1])[self.space.seg]
+
+    def local_strategy(self):
+        pos = np.maximum(self.regrets, 0.0)
+        totals = self._segment_sum(pos)
+        local = np.divide(pos, totals, out=1.0 / self.seg_sizes, where=totals > 0)
+        self.last_local = local
+        return local
+
+    def next_strategy(self):
+        local = self.local_strategy()
+        # the extra slot at index `size` is the empty sequence, with reach 1
+        x = np.empty(self.space.size + 1)
+        x[-1] = 1.0
+        for lvl in self.space.levels:
+            x[lvl] = local[lvl] * x[self.space.seq_parent[lvl]]
+        return x[:-1]
+
+    def counterfactual_values(self, util):
+        """
+        Sequence utilities plus, bottom-up, the expected value under the
+        current strategy of every decision node below each sequence.
+        """
+        v = np.append(util, 0.0)
+        for lvl, infosets in zip(reversed(self.space.levels), reversed(self.level_infosets)):
+            ev = np.add.reduceat(self.last_local * v[:-1], self.space.starts[:-1])[infosets]
+            np.add.at(v, self.space.parent[infosets], ev)
+        return v[:-1]
+
+    def observe_utility(self, util):
+        self.observe_local_utility(self.counterfactual_values(util))
+
+    def observe_local_utility(self, util):
+        # one regret-matching step per decision node on `util` as given
+        self.t += 1
+        ev = self._segment_sum(self.last_local * util)
+        self.regrets += util - ev
+        self.discount()
+
+    def discount(self):
+        if self.plus:
+            np.maximum(self.regrets, 0.0, out=self.regrets)
+
+    def average_weight(self, t):
+        # CFR+ averages linearly, vanilla CFR uniformly
+        return t if self.plus else 1
+
+
+class DiscountedVectorCfr(VectorCfr):
+    """
+    Discounted CFR (Brown & Sandholm 2019): after iteration t positive
+    regrets are scaled by t^a/(t^a+1), negative ones by t^b/(t^b+1), and
+    iteration t enters the average strategy with weight t^gamma.
+    """
+    def __init__(self, space, alpha=1.5, beta=0.0, gamma=2.0):
+        super().__init__(space)
+        self.alpha, self.beta, self.gamma = alpha, beta, gamma
+
+    def discount(self):
+        pos = self.t**self.alpha
+        neg = self.t**self.beta
+        self.regrets *= np.where(self.regrets > 0, pos / (pos + 1), neg / (neg + 1))
+
+    def average_weight(self, t):
+        return t**self.gamma
+
+
+class LinearVectorCfr(DiscountedVectorCfr):
+    # Linear CFR: iteration t's regrets and strategy weighted by t (DCFR 1,1,1)
+    def __init__(self, space):
+        super().__init__(space, alpha=1.0, beta=1.0, gamma=1.0)
+
+
+def average_policy(space, cum):
+    # behavioural policy {infoset: {action: prob}} from a summed sf strategy
+    totals = np.add.reduceat(cum, space.starts[:-1])
+    policy = {}
+    for i, I in enumerate(space.infoset_ids):
+        lo, hi = space.starts[i], space.starts[i + 1]
+        actions = [a for _, a in space.sequences[lo:hi]]
+        if totals[i] > 0:
+            probs = (cum[lo:hi] / totals[i]).tolist()
+        else:
+            probs = [1.0 / len(actions)] * len(actions)
+        policy[I] = dict(zip(actions, probs))
+    return policy
+
+
+def solve(cg, iterations, plus=True, log=False, state=None, callback=None,
+          minimizer=None, alternating=False):
+    """
+    Self-play on a CompiledGame (the cfr_train.py loop). `minimizer(space)`
+    builds each player's regret minimizer (default VectorCfr with `plus`);
+    its average_weight(t) weights the average strategies, which are
+    returned in sequence form.
+    Updates are simultaneous, or with `alternating` P2 responds to P1's
+    already-updated strategy.
+    `state` (regrets_pl1/pl2, cum_pl1/pl2, iteration) continues an earlier
+    run; `callback(t, cfr1, cfr2, cum1, cum2)` runs after every iteration
+    and stops the run early by returning True.
+    """
+    if minimizer is None:
+        minimizer = lambda space: VectorCfr(space, plus=plus)
+    cfr1 = minimizer(cg.pl1)
+    cfr2 = minimizer(cg.pl2)
+    cum1 = np.zeros(cg.pl1.size)
+    cum2 = np.zeros(cg.pl2.size)
+    start = 0
+    if state is not None:
+        cfr1.regrets[:] = state["regrets_pl1"]
+        cfr2.regrets[:] = state["regrets_pl2"]
+        cum1[:] = state["cum_pl1"]
+        cum2[:] = state["cum_pl2"]
+        start = cfr1.t = cfr2.t = state["iteration"]
+    total = sum(cfr1.average_weight(t) for t in range(1, start + 1))
+    tel = telemetry.active
+    x = cfr1.next_strategy()
+    for t in range(start + 1, iterations + 1):
+        with tel.phase("next_strategy"):
+            y = cfr2.next_strategy()
+        with tel.phase("averaging"):
+            w = cfr1.average_weight(t)
+            total += w
+            cum1 += w * x
+            cum2 += w * y
+        with tel.phase("utility_pl1"):
+            u1 = cg.utility_pl1(y)
+        with tel.phase("regret_update"):
+            cfr1.observe_utility(u1)
+        with tel.phase("next_strategy"):
+            x_next = cfr1.next_strategy()
+        with tel.phase("utility_pl2"):
+            u2 = cg.utility_pl2(x_next if alternating else x)
+        with tel.phase("regret_update"):
+            cfr2.observe_utility(u2)
+        x = x_next
+        tel.count("entries_scanned", 2 * len(cg.values))
+        tel.count("infosets_touched", cg.pl1.num_infosets + cg.pl2.num_infosets)
+        tel.iteration(t, lambda: {"gap": float(gap(cg, cum1 / total, cum2 / total)),
+                                  "value_pl1": float(cg.expected_utility_pl1(cum1 / total, cum2 / total))})
+        if log and t % max(iterations // 10, 1) == 0:
+            print(f"{type(cfr1).__name__} self-play iteration {t}/{iterations}")
+        if callback is not None and callback(t, cfr1, cfr2, cum1, cum2):
+            break
+    return cum1 / total, cum2 / total
+
+
+def best_response_value(space, util):
+    # array form of stub.best_response_value: bottom-up, one level at a time
+    u = np.append(util, 0.0)
+    for lvl in reversed(space.levels):
+        infosets = np.unique(space.seg[lvl])
+        ev = np.maximum.reduceat(u[:-1], space.starts[:-1])[infosets]
+        np.add.at(u, space.parent[infosets], ev)
+    return u[-1]
+
+
+def gap(cg, x, y):
+    return (best_response_value(cg.pl1, cg.utility_pl1(y))
+            + best_response_value(cg.pl2, cg.utility_pl2(x)))
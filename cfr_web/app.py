@@ -1,69 +1,247 @@
 #!/usr/bin/env python3
 from flask import Flask, request, jsonify, render_template
-import json, random, os
+import os, json, time, threading
+from policy_registry import PolicyRegistry
+from sampling import (
+    batch_claim_distributions,
+    batch_response_distributions,
+    sample_rows,
+)
 
 app = Flask(__name__)
 
-# Load your MCCFR+ policy file (must contain both P1 and P2 infosets)
-POLICY_PATH = os.path.join(
+# Compiled MCCFR+ policy (both P1 and P2 infosets), memory-mapped so that
+# workers share it; build it with policy_store.py from the trainer's json
+POLICY_PATH = os.environ.get("POLICY_PATH", os.path.join(
     os.path.dirname(__file__),
-    "../policies/liarsdice_5die_mccfr_policy.json"
-)
-with open(POLICY_PATH) as f:
-    policy = json.load(f)
+    "../policies/liarsdice_5die_mccfr_policy.bin"
+))
+# Per-dice-state subgame policies (subgame_train.py), used by the default
+# variant for hand sizes POLICY_PATH does not cover
+SUBGAMES_PATH = os.environ.get("SUBGAMES_PATH", os.path.join(
+    os.path.dirname(__file__),
+    "../policies/liarsdice_subgames.npz"
+))
+# Optional json adding variants: {"default": name, "variants": {name: [artifact, ...]}},
+# paths relative to the json; requests pick one with "variant"
+POLICY_REGISTRY = os.environ.get("POLICY_REGISTRY")
+# bytes of policy rows and sampler caches kept resident per worker
+POLICY_CACHE_MB = float(os.environ.get("POLICY_CACHE_MB", "64"))
+# seconds between checks for changed artifacts (0 disables)
+POLICY_WATCH_INTERVAL = float(os.environ.get("POLICY_WATCH_INTERVAL", "2"))
+
+def _registry():
+    variants = {"default": [POLICY_PATH] + ([SUBGAMES_PATH] if os.path.isfile(SUBGAMES_PATH) else [])}
+    default = "default"
+    if POLICY_REGISTRY:
+        with open(POLICY_REGISTRY) as f:
+            config = json.load(f)
+        base = os.path.dirname(os.path.abspath(POLICY_REGISTRY))
+        for name, paths in config.get("variants", {}).items():
+            variants[name] = [os.path.join(base, p) for p in paths]
+        default = config.get("default", default)
+    return PolicyRegistry(variants, default, int(POLICY_CACHE_MB * (1 << 20)))
+
+registry = _registry()
+
+def reload_policy():
+    """
+    Load and validate changed artifacts off the request path and swap them
+    into the registry. Requests hold the policy they looked up, so each
+    runs entirely on either the old or the new one. Returns True on a swap.
+    """
+    return registry.refresh()
 
-def normalize(dist):
-    total = sum(dist.values())
-    if total <= 0:
-        # uniform fallback
-        n = len(dist)
-        return {k: 1/n for k in dist}
-    return {k: v/total for k, v in dist.items()}
+def _watch_policy():
+    while True:
+        time.sleep(POLICY_WATCH_INTERVAL)
+        try:
+            if reload_policy():
+                app.logger.info("reloaded policies: %s", registry.metrics()["resident"])
+        except (OSError, ValueError) as e:
+            # keep serving the current policies
+            app.logger.warning("policy reload failed: %s", e)
+
+_watcher_pid = None
+_watcher_lock = threading.Lock()
+
+@app.before_request
+def _start_watcher():
+    # one watcher per process, started by its first request: a thread started
+    # at import would live only in the master under gunicorn --preload
+    global _watcher_pid
+    if POLICY_WATCH_INTERVAL <= 0 or _watcher_pid == os.getpid():
+        return
+    with _watcher_lock:
+        if _watcher_pid != os.getpid():
+            threading.Thread(target=_watch_policy, daemon=True).start()
+            _watcher_pid = os.getpid()
 
 @app.route("/")
 def home():
     return render_template("index.html")
 
+def _count(state, field, default):
+    # a dice count field as an int (`default` when absent); ValueError otherwise
+    v = state.get(field)
+    if v is None:
+        return default
+    try:
+        return int(v)
+    except (TypeError, ValueError):
+        raise ValueError(f"{field} must be an integer, got {v!r}")
+
+def _hand(state, max_face=None):
+    # the hand as a list of faces >= 1 (and <= max_face if given); ValueError otherwise
+    hand = state.get("hand", [])
+    if not isinstance(hand, list) or not all(
+            type(d) is int and 1 <= d <= (max_face or d) for d in hand):
+        raise ValueError(f"hand must be a list of faces 1..{max_face or 'max_face'}, got {hand!r}")
+    return hand
+
+def _route(state):
+    """
+    Registry key for one /action state: the AI's hand against the user's
+    p2Count dice (unknown for responses that omit it), in the requested
+    variant. Raises KeyError for an unknown variant and ValueError for a
+    malformed hand or a non-integer p2Count.
+    """
+    player = "pl1" if state.get("player") == "pl1" else "pl2"
+    hand   = _hand(state)
+    return registry.route(state.get("variant"), player, len(hand), _count(state, "p2Count", None))
+
+def _unknown_variant(state):
+    return jsonify({"error": f"unknown variant {state.get('variant')!r}",
+                    "variants": sorted(registry.variants)}), 400
+
+def _bad_request(e):
+    return jsonify({"error": str(e)}), 400
+
 @app.route("/action", methods=["POST"])
 def action():
     data   = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
     player = data.get("player")
+    try:
+        key = _route(data)
+        p1c = _count(data, "p1Count", len(_hand(data)))
+        p2c = _count(data, "p2Count", 0)
+    except KeyError:
+        return _unknown_variant(data)
+    except ValueError as e:
+        return _bad_request(e)
+    policy = registry.get(key)
+    try:
+        # faces above the policy's max_face have no hand row
+        hand = _hand(data, policy.store.max_face)
+    except ValueError as e:
+        return _bad_request(e)
+    sampler = policy.sampler
 
     if player == "pl1":
         # AI is making a claim: filter bids by total dice
-        hand    = data.get("hand", [])
-        p1c     = int(data.get("p1Count", len(hand)))
-        p2c     = int(data.get("p2Count", 0))
         total_dice = p1c + p2c
 
-        key     = str(tuple(sorted(hand)))
-        base    = policy.get(key, {})
-        filtered = {}
-        # Only keep claims with Q <= total_dice
-        for action, prob in base.items():
-            parts = action.split("_")
-            if len(parts) == 3:
-                Q = int(parts[1])
-                if Q <= total_dice:
-                    filtered[action] = prob
-
-        dist = normalize(filtered) if filtered else normalize(base)
-        actions, weights = zip(*dist.items())
-        choice = random.choices(actions, weights)[0]
+        # Only claims with Q <= total_dice; O(1) from a cached alias table
+        choice = sampler.sample_claim(hand, total_dice)
 
     else:
         # AI is responding to your claim
-        hand   = data.get("hand", [])
         claim  = data.get("claim", "")
-        key2   = str((tuple(sorted(hand)), claim))
-        base2  = policy.get(key2, {})
-        if not base2:
-            base2 = {"accept":0.5, "call":0.5}
-        dist = normalize(base2)
-        actions, weights = zip(*dist.items())
-        choice = random.choices(actions, weights)[0]
+        choice = sampler.sample_response(hand, claim)
 
     return jsonify({"action": choice})
 
+# Largest number of states accepted by one /action/batch request
+MAX_BATCH = 1024
+
+@app.route("/action/batch", methods=["POST"])
+def action_batch():
+    """
+    Bulk form of /action. Body:
+        {"states": [{"player", "hand", "p1Count", "p2Count", "claim"}, ...],
+         "distributions": false}
+    Each state reads the same fields as /action. Returns {"actions": [...]}
+    in request order, plus "distributions" (one {action: prob} per state)
+    when requested. At most MAX_BATCH states per request (413 otherwise).
+    """
+    data   = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({"error": "expected a JSON object"}), 400
+    states = data.get("states")
+    if not isinstance(states, list):
+        return jsonify({"error": "expected a list under 'states'"}), 400
+    if len(states) > MAX_BATCH:
+        return jsonify({"error": f"at most {MAX_BATCH} states per batch"}), 413
+    if not all(isinstance(s, dict) for s in states):
+        return jsonify({"error": "every state must be a JSON object"}), 400
+
+    # group states by player and routed policy, one batched call per group
+    groups = {}
+    for i, s in enumerate(states):
+        try:
+            key = _route(s)
+            _count(s, "p1Count", 0)
+        except KeyError:
+            return _unknown_variant(s)
+        except ValueError as e:
+            return _bad_request(e)
+        groups.setdefault((s.get("player") == "pl1", key), []).append(i)
+    actions = [None] * len(states)
+    dists   = [None] * len(states)
+
+    for (claiming, key), idx in groups.items():
+        policy = registry.get(key).store
+        try:
+            hands = [_hand(states[i], policy.max_face) for i in idx]
+        except ValueError as e:
+            return _bad_request(e)
+        if claiming:
+            totals = [_count(states[i], "p1Count", len(h)) + _count(states[i], "p2Count", 0)
+                      for i, h in zip(idx, hands)]
+            d, names = batch_claim_distributions(policy, hands, totals), policy.claims
+        else:
+            claims = [states[i].get("claim", "") for i in idx]
+            d, names = batch_response_distributions(policy, hands, claims), policy.responses
+        for i, row, k in zip(idx, d, sample_rows(d)):
+            actions[i] = names[k]
+            dists[i]   = (names, row)
+
+    out = {"actions": actions}
+    if data.get("distributions"):
+        out["distributions"] = [
+            {a: p for a, p in zip(names, row.tolist()) if p > 0}
+            for names, row in dists
+        ]
+    return jsonify(out)
+
+def primary():
+    # the POLICY_PATH store, reported by /policy
+    return registry.get((POLICY_PATH,))
+
+@app.route("/policy", methods=["GET"])
+def policy_info():
+    cur = primary()
+    return jsonify({
+        "version":   cur.store.version,
+        "path":      cur.store.path,
+        "loaded_at": cur.loaded_at,
+    })
+
+@app.route("/policy/registry", methods=["GET"])
+def policy_registry():
+    # this worker's resident policies and hit/miss/eviction counters
+    return jsonify(registry.metrics())
+
+@app.route("/policy/reload", methods=["POST"])
+def policy_reload():
+    # reload this worker now instead of waiting for the watcher
+    try:
+        reloaded = reload_policy()
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e), "version": primary().store.version}), 409
+    return jsonify({"reloaded": reloaded, "version": primary().store.version})
+
 if __name__ == "__main__":
     app.run(debug=True)
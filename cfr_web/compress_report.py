@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Pick a serving compression level for a policy. For every --thresholds x
+--bits combination the policy is written as a sparse fixed-point store
+(policy_store.compress_policy) and compared with the source: file size,
+load time (PolicyStore + validate, best of --repeats), exact NashConv of
+the one-turn game (exploitability.QuantityFaceGame) and the exact match
+win rate against every responder in match_sim.batch_benches
+(match_exact.win_probability). Levels within --max-nashconv and
+--max-winrate of the source are marked; --out writes the smallest of them.
+
+    python compress_report.py
+    python compress_report.py --thresholds 0.001 0.01 --bits 6 8 --out ../policies/mccfr_sparse.bin
+"""
+import os, sys, time, argparse, tempfile
+import numpy as np
+import match_sim
+import match_exact
+from policy_store import PolicyStore, policy_rows, compress_policy
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../cfr_files"))
+from exploitability import QuantityFaceGame
+
+
+def load_seconds(path, repeats):
+    best = float("inf")
+    for _ in range(repeats):
+        t = time.perf_counter()
+        PolicyStore(path).validate()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def evaluate(claim_rows, response_rows, game):
+    # NashConv of the one-turn game and exact match win rate per responder
+    nash_conv = game.exploitability(np.asarray(claim_rows, dtype=np.float64),
+                                    np.asarray(response_rows, dtype=np.float64)[..., 0])["nash_conv"]
+    win = {name: match_exact.win_probability(fn, claim_rows=np.asarray(claim_rows))[0]
+           for name, fn in match_sim.batch_benches.items()}
+    return nash_conv, win
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Size, load time and quality loss of sparse quantized policies")
+    p.add_argument("--policy", default=match_sim.POLICY_PATH, help="policy json or compiled store")
+    p.add_argument("--thresholds", type=float, nargs="+", default=[0.0, 1e-3, 1e-2, 5e-2])
+    p.add_argument("--bits", type=int, nargs="+", default=[4, 6, 8, 12, 16])
+    p.add_argument("--max-nashconv", type=float, default=0.01, help="allowed NashConv increase")
+    p.add_argument("--max-winrate", type=float, default=0.002, help="allowed win rate change per responder")
+    p.add_argument("--repeats", type=int, default=20)
+    p.add_argument("--out", help="write the smallest level within both limits here")
+    args = p.parse_args()
+
+    policy = match_sim.policy
+    game = QuantityFaceGame(policy.num_dice, policy.max_face)
+    for n in range(1, policy.num_dice + 1):
+        match_exact.hand_tables(n)
+
+    if args.policy.endswith(".json"):
+        t = time.perf_counter()
+        claim_rows, response_rows = policy_rows(args.policy, policy.num_dice, policy.max_face)
+        source_load = time.perf_counter() - t
+    else:
+        source = PolicyStore(args.policy)
+        claim_rows, response_rows = np.array(source.claim_rows), np.array(source.response_rows)
+        source_load = load_seconds(args.policy, args.repeats)
+    base_nc, base_win = evaluate(claim_rows, response_rows, game)
+    names = list(base_win)
+
+    print(f"{'threshold':>10}{'bits':>5}{'KB':>8}{'load ms':>9}{'NashConv':>10}{'dNashConv':>11}"
+          + "".join(f"{n[:13]:>14}" for n in names))
+    print(f"{'source':>15}{os.path.getsize(args.policy) / 1024:>8.1f}{1e3 * source_load:>9.2f}"
+          f"{base_nc:>10.5f}{'':>11}" + "".join(f"{base_win[n]:>14.4%}" for n in names))
+
+    levels = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for threshold in args.thresholds:
+            for bits in args.bits:
+                path = os.path.join(tmp, f"{threshold}_{bits}.bin")
+                compress_policy(claim_rows, response_rows, path, threshold, bits,
+                                policy.num_dice, policy.max_face)
+                store = PolicyStore(path)
+                nash_conv, win = evaluate(store.claim_rows, store.response_rows, game)
+                d_win = max(abs(win[n] - base_win[n]) for n in names)
+                ok = nash_conv - base_nc <= args.max_nashconv and d_win <= args.max_winrate
+                size = os.path.getsize(path)
+                levels.append((size, threshold, bits, ok))
+                print(f"{threshold:>10g}{bits:>5}{size / 1024:>8.1f}{1e3 * load_seconds(path, args.repeats):>9.2f}"
+                      f"{nash_conv:>10.5f}{nash_conv - base_nc:>+11.5f}"
+                      + "".join(f"{100 * (win[n] - base_win[n]):>+12.3f}pp" for n in names)
+                      + ("  *" if ok else ""))
+
+    # smallest file; among equal sizes the finest quantization, then the lowest threshold
+    safe = sorted((l for l in levels if l[3]), key=lambda l: (l[0], -l[2], l[1]))
+    print(f"win rates of compressed levels are changes in percentage points; "
+          f"* within +{args.max_nashconv} NashConv and {args.max_winrate:.2%} win rate of the source")
+    if not safe:
+        print("no level is within both limits")
+    else:
+        size, threshold, bits, _ = safe[0]
+        print(f"smallest: --threshold {threshold:g} --bits {bits} ({size / 1024:.1f} KB)")
+        if args.out:
+            compress_policy(claim_rows, response_rows, args.out, threshold, bits,
+                            policy.num_dice, policy.max_face,
+                            {"source": os.path.basename(args.policy)})
+            print("Wrote", args.out)
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import requests, random
+import requests, random, argparse
 
 API = "http://127.0.0.1:5000/action"
+BATCH_API = "http://127.0.0.1:5000/action/batch"
 
 def query(player, roll, history):
     """Ask the Flask server for an action."""
@@ -39,13 +40,49 @@ def play_one():
     else:  # call
         return 1 if r1 < lvl else -1
 
+def query_batch(states):
+    """Ask the Flask server for one action per state in a single request."""
+    r = requests.post(BATCH_API, json={"states": states})
+    r.raise_for_status()
+    return r.json()["actions"]
+
+def play_batch(n):
+    """
+    Play n one-turn quantity/face games with two requests in total: the AI
+    claims for every P1 hand, then the AI responds for every P2 hand.
+    Returns P1's outcome (+1/-1) per game.
+    """
+    r1s = [[random.randint(1, 6) for _ in range(5)] for _ in range(n)]
+    r2s = [[random.randint(1, 6) for _ in range(5)] for _ in range(n)]
+    claims = query_batch([{"player": "pl1", "hand": h, "p1Count": 5, "p2Count": 5}
+                          for h in r1s])
+    resps = query_batch([{"player": "pl2", "hand": h, "claim": c}
+                         for h, c in zip(r2s, claims)])
+    results = []
+    for r1, r2, claim, resp in zip(r1s, r2s, claims, resps):
+        Q, F = map(int, claim.split("_")[1:])
+        true = r1.count(F) + r2.count(F) >= Q
+        results.append(1 if true == (resp == "accept") else -1)
+    return results
+
 if __name__=="__main__":
-    N = 10_000
+    p = argparse.ArgumentParser()
+    p.add_argument("--games", type=int, default=10_000)
+    p.add_argument("--batch", type=int, default=0,
+                   help="play the quantity/face game through /action/batch, this many games per request")
+    args = p.parse_args()
+
+    N = args.games
     wins = 0
-    for i in range(1, N+1):
-        if play_one() == 1:
-            wins += 1
-        if i % 1000 == 0:
-            print(f"After {i} games, win rate = {wins/i:.3f}")
+    if args.batch:
+        for done in range(0, N, args.batch):
+            n = min(args.batch, N - done)
+            wins += sum(1 for r in play_batch(n) if r == 1)
+            print(f"After {done + n} games, win rate = {wins/(done + n):.3f}")
+    else:
+        for i in range(1, N+1):
+            if play_one() == 1:
+                wins += 1
+            if i % 1000 == 0:
+                print(f"After {i} games, win rate = {wins/i:.3f}")
     print(f"Final P1 win rate over {N} games: {wins/N:.3f}")
-
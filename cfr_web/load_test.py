@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Asynchronous load test of POST /action. `--concurrency` client tasks share
+a pool of keep-alive HTTP/1.1 connections (plain asyncio streams, no extra
+dependencies) and send a mix of pl1 claim and pl2 response requests shaped
+like the UI's: random dice counts 1..5 per player, the AI's hand of
+p1Count dice and, for pl2, a feasible claim by the user's p2Count dice. Reports throughput and
+p50/p95/p99 latency overall and per player; --out appends the result as a
+JSON line for comparison across commits.
+
+By default the app is started locally on a free port: Flask's threaded
+server (which closes every connection, so the pool reconnects per
+request) or, with --gunicorn N, N gthread workers that keep connections
+alive. --url targets a running server instead.
+
+    python load_test.py --concurrency 32 --duration 10
+    python load_test.py --gunicorn 4 --concurrency 64 --out load_results.jsonl
+"""
+import os, sys, json, time, random, socket, asyncio, argparse, subprocess
+import urllib.request
+from urllib.parse import urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(xs, q):
+    xs = sorted(xs)
+    return xs[min(int(q * len(xs)), len(xs) - 1)] if xs else float("nan")
+
+
+class ConnectionPool:
+    """
+    Keep-alive HTTP/1.1 connections to one host. Requests take an idle
+    connection (or open one), and return it unless the server asked to
+    close; at most `size` connections are open at once.
+    """
+    def __init__(self, url, size):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.idle = []
+        self.slots = asyncio.Semaphore(size)
+        self.opened = 0
+
+    async def post_json(self, path, payload):
+        body = json.dumps(payload).encode()
+        head = (f"POST {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+                f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode()
+        async with self.slots:
+            for attempt in (0, 1):
+                reused = bool(self.idle)
+                reader, writer = self.idle.pop() if reused else await self._open()
+                try:
+                    writer.write(head + body)
+                    await writer.drain()
+                    status, headers, data = await self._read_response(reader)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    writer.close()
+                    if reused and attempt == 0:
+                        continue  # the server dropped an idle connection; retry on a fresh one
+                    raise
+                if headers.get("connection", "").lower() == "close":
+                    writer.close()
+                else:
+                    self.idle.append((reader, writer))
+                return status, data
+
+    async def _open(self):
+        self.opened += 1
+        return await asyncio.open_connection(self.host, self.port)
+
+    @staticmethod
+    async def _read_response(reader):
+        status_line = await reader.readuntil(b"\r\n")
+        if not status_line:
+            raise ConnectionError("connection closed")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            k, v = line.decode("latin-1").split(":", 1)
+            headers[k.strip().lower()] = v.strip()
+        data = await reader.readexactly(int(headers.get("content-length", 0)))
+        return status, headers, data
+
+    def close(self):
+        for _, writer in self.idle:
+            writer.close()
+
+
+def make_request(rng, pl1_fraction):
+    # one /action payload: random dice counts, the AI's hand (p1Count dice), a feasible claim for pl2
+    p1c, p2c = rng.randint(1, 5), rng.randint(1, 5)
+    if rng.random() < pl1_fraction:
+        hand = [rng.randint(1, 6) for _ in range(p1c)]
+        return "pl1", {"player": "pl1", "hand": hand, "p1Count": p1c, "p2Count": p2c}
+    hand = [rng.randint(1, 6) for _ in range(p1c)]
+    claim = f"claim_{rng.randint(1, p1c + p2c)}_{rng.randint(1, 6)}"
+    return "pl2", {"player": "pl2", "hand": hand, "claim": claim, "p1Count": p1c, "p2Count": p2c}
+
+
+async def run_load(url, concurrency, duration, warmup, pl1_fraction, seed):
+    pool = ConnectionPool(url, concurrency)
+    path = urlsplit(url).path.rstrip("/") + "/action"
+    latencies = {"pl1": [], "pl2": []}
+    errors = [0]
+    start = time.perf_counter()
+    measure_from, stop_at = start + warmup, start + warmup + duration
+
+    async def client(i):
+        rng = random.Random(f"{seed}-{i}")
+        while True:
+            player, payload = make_request(rng, pl1_fraction)
+            t = time.perf_counter()
+            if t >= stop_at:
+                return
+            try:
+                status, _ = await pool.post_json(path, payload)
+                ok = status == 200
+            except (OSError, asyncio.IncompleteReadError):
+                ok = False
+            done = time.perf_counter()
+            if t >= measure_from:
+                if ok:
+                    latencies[player].append(done - t)
+                else:
+                    errors[0] += 1
+
+    await asyncio.gather(*(client(i) for i in range(concurrency)))
+    pool.close()
+    return latencies, errors[0], pool.opened
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, gunicorn_workers):
+    env = dict(os.environ, POLICY_WATCH_INTERVAL="0")
+    if gunicorn_workers:
+        # gthread workers keep connections alive; the sync worker closes each one
+        cmd = [sys.executable, "-m", "gunicorn", "-w", str(gunicorn_workers), "-k", "gthread",
+               "--threads", "4", "-b", f"127.0.0.1:{port}", "app:app"]
+    else:
+        cmd = [sys.executable, "-c",
+               f"from app import app; app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"server exited with status {proc.returncode}: {' '.join(cmd)}")
+        try:
+            urllib.request.urlopen(url + "/policy", timeout=1).read()
+            return proc, url
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("server did not come up within 30s")
+
+
+def report(latencies, errors, duration, concurrency, connections):
+    ms = lambda x: f"{1e3 * x:7.2f}"
+    everything = latencies["pl1"] + latencies["pl2"]
+    print(f"{len(everything):,} requests in {duration:.1f}s at concurrency {concurrency} "
+          f"({len(everything) / duration:,.0f} req/s), {errors} errors, {connections} connections opened")
+    print(f"{'':<6}{'count':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    rows = {}
+    for name, xs in (("all", everything), ("pl1", latencies["pl1"]), ("pl2", latencies["pl2"])):
+        if xs:
+            rows[name] = {"count": len(xs), "p50": percentile(xs, .5), "p95": percentile(xs, .95),
+                          "p99": percentile(xs, .99), "max": max(xs)}
+            r = rows[name]
+            print(f"{name:<6}{r['count']:>9,}{ms(r['p50'])}  {ms(r['p95'])}  {ms(r['p99'])}  {ms(r['max'])}")
+    return {"requests": len(everything), "errors": errors, "req_per_sec": len(everything) / duration,
+            "latency": rows}
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Async load test of the /action endpoint")
+    p.add_argument("--url", help="base URL of a running server (default: start one locally)")
+    p.add_argument("--gunicorn", type=int, default=0, metavar="N",
+                   help="start gunicorn with N workers instead of Flask's threaded server")
+    p.add_argument("--concurrency", type=int, default=16, help="in-flight requests (and pooled connections)")
+    p.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    p.add_argument("--warmup", type=float, default=1.0, help="unmeasured seconds before that")
+    p.add_argument("--pl1-fraction", type=float, default=0.5, help="share of claim (pl1) requests")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--out", help="append the result as a JSON line")
+    args = p.parse_args()
+
+    proc = None
+    url = args.url
+    if url is None:
+        proc, url = start_server(free_port(), args.gunicorn)
+    try:
+        latencies, errors, connections = asyncio.run(run_load(
+            url, args.concurrency, args.duration, args.warmup, args.pl1_fraction, args.seed))
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+    result = report(latencies, errors, args.duration, args.concurrency, connections)
+    if args.out:
+        server = args.url or (f"gunicorn x{args.gunicorn}" if args.gunicorn else "flask threaded")
+        with open(args.out, "a") as f:
+            f.write(json.dumps({"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "server": server,
+                                "concurrency": args.concurrency, "pl1_fraction": args.pl1_fraction,
+                                **result}) + "\n")
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Win-rate evaluation of the policy against the match_sim responders, fanned
+out over a process pool. Matches are played in chunks; chunk k draws from
+its own stream SeedSequence(seed).spawn(...)[k] and results are consumed
+in chunk order, so a run is reproducible from --seed and --chunk whatever
+the number of workers. After every chunk the Wilson interval is updated
+and the run stops once it is narrower than --ci-width, or once a Wald
+sequential probability ratio test settles whether the win rate is above
+--better-than (with an indifference zone of +-margin around it).
+
+    python match_eval.py --seed 1 --ci-width 0.005
+    python match_eval.py --better-than 0.55 --responders random50/50 call_90%
+"""
+import os, math, time, random, argparse
+import multiprocessing
+from statistics import NormalDist
+import numpy as np
+import match_sim
+
+
+def wilson_interval(wins, n, confidence=0.95):
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = wins / n
+    centre = (p + z * z / (2 * n)) / (1 + z * z / n)
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+    return centre - half, centre + half
+
+
+class Sprt:
+    """
+    Wald SPRT of H0: p = p0 - margin against H1: p = p0 + margin, with
+    error rates alpha (accepting H1 under H0) and beta. decide() returns
+    "better", "not better" or None while undecided.
+    """
+    def __init__(self, p0, margin=0.01, alpha=0.05, beta=0.05):
+        lo, hi = max(p0 - margin, 1e-9), min(p0 + margin, 1 - 1e-9)
+        self.win, self.loss = math.log(hi / lo), math.log((1 - hi) / (1 - lo))
+        self.upper = math.log((1 - beta) / alpha)
+        self.lower = math.log(beta / (1 - alpha))
+
+    def decide(self, wins, n):
+        llr = wins * self.win + (n - wins) * self.loss
+        if llr >= self.upper:
+            return "better"
+        if llr <= self.lower:
+            return "not better"
+        return None
+
+
+def play_chunk(task):
+    # one chunk of matches on its own stream; returns (AI wins, matches)
+    name, n, seed, scalar = task
+    if scalar:
+        random.seed(int(seed.generate_state(1)[0]))
+        fn = match_sim.benches[name]
+        return sum(match_sim.play_one_match(fn) == 1 for _ in range(n)), n
+    won = match_sim.play_matches(n, match_sim.batch_benches[name], np.random.default_rng(seed))
+    return int(won.sum()), n
+
+
+def evaluate(name, seed=0, chunk=20000, max_matches=1_000_000, workers=None,
+             ci_width=0.01, confidence=0.95, better_than=None, margin=0.01, scalar=False):
+    """
+    Play chunks of matches against responder `name` until the stopping rule
+    fires or `max_matches` are played; returns a summary dict.
+    """
+    workers = workers or os.cpu_count()
+    sprt = Sprt(better_than, margin, 1 - confidence, 1 - confidence) if better_than is not None else None
+    sizes = [min(chunk, max_matches - i) for i in range(0, max_matches, chunk)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    tasks = [(name, n, s, scalar) for n, s in zip(sizes, seeds)]
+
+    start = time.perf_counter()
+    wins = n = 0
+    stop = "max_matches"
+    with multiprocessing.Pool(workers) if workers > 1 else _InProcess() as pool:
+        for w, k in pool.imap(play_chunk, tasks):
+            wins, n = wins + w, n + k
+            if sprt is not None:
+                verdict = sprt.decide(wins, n)
+                if verdict is not None:
+                    stop = f"sprt: {verdict} than {better_than:.2%}"
+                    break
+            else:
+                lo, hi = wilson_interval(wins, n, confidence)
+                if hi - lo < ci_width:
+                    stop = "ci_width"
+                    break
+    lo, hi = wilson_interval(wins, n, confidence)
+    return {"responder": name, "matches": n, "wins": wins, "win_rate": wins / n if n else float("nan"),
+            "ci": (lo, hi), "confidence": confidence, "stop": stop,
+            "seconds": time.perf_counter() - start}
+
+
+class _InProcess:
+    # Pool stand-in for workers=1
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def imap(self, fn, tasks):
+        return map(fn, tasks)
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Reproducible parallel win-rate evaluation with early stopping")
+    p.add_argument("--responders", nargs="+", default=list(match_sim.benches),
+                   choices=list(match_sim.benches))
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    p.add_argument("--chunk", type=int, default=20000, help="matches per task and per stopping check")
+    p.add_argument("--max-matches", type=int, default=1_000_000)
+    p.add_argument("--ci-width", type=float, default=0.01, help="stop once the interval is narrower")
+    p.add_argument("--confidence", type=float, default=0.95)
+    p.add_argument("--better-than", type=float, default=None,
+                   help="stop when an SPRT decides whether the win rate beats this (e.g. 0.55)")
+    p.add_argument("--margin", type=float, default=0.01, help="SPRT indifference zone half-width")
+    p.add_argument("--scalar", action="store_true", help="play with play_one_match instead of play_matches")
+    args = p.parse_args()
+
+    for name in args.responders:
+        r = evaluate(name, args.seed, args.chunk, args.max_matches, args.workers, args.ci_width,
+                     args.confidence, args.better_than, args.margin, args.scalar)
+        lo, hi = r["ci"]
+        print(f"AI vs {name:<14}: {r['win_rate']:.2%}  {r['confidence']:.0%} CI [{lo:.2%}, {hi:.2%}]  "
+              f"{r['matches']:>9,} matches  {r['seconds']:6.2f}s  stop: {r['stop']}")
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Exact AI win probability over full matches (match_sim.play_one_match).
+A match is a Markov chain over (p1Count, p2Count, isP1Turn): each round
+the claimant's claim distribution comes from the policy (or the uniform
+fallback for other hand sizes), the responder's dice showing the claimed
+face are Binomial(count, 1/max_face), and a batch responder from
+match_sim gives the call probability. The per-round outcome probabilities
+fill a linear system over the transient states, solved in one shot.
+
+    python match_exact.py               # exact win rates for every responder
+    python match_exact.py --check 2000000   # and compare with play_matches
+    python match_exact.py --subgames ../policies/liarsdice_subgames.npz
+"""
+import time, argparse
+from math import comb
+import numpy as np
+import match_sim
+from policy_store import SubgameStore
+from hands import sorted_hands
+
+policy = match_sim.policy
+
+
+def binomial_pmf(n, p):
+    return np.array([comb(n, k) * p**k * (1 - p)**(n - k) for k in range(n + 1)])
+
+
+_hands = {}
+
+def hand_tables(n):
+    # multinomial weights of the hands of n dice and their count of each claim's face [H, C]
+    if n not in _hands:
+        faces = [int(c.split('_')[2]) for c in policy.claims]
+        hands, w = sorted_hands(n, policy.max_face)
+        w = np.array(w)
+        _hands[n] = w, np.array([[h.count(f) for f in faces] for h in hands])
+    return _hands[n]
+
+
+def claim_face_counts(a, total, rows=None):
+    """
+    D[c, k]: probability that a claimant holding `a` dice (of `total` in
+    play) claims c while holding k dice of c's face. `rows` [hands of a
+    dice, claims] overrides the claim policy; by default the policy's rows
+    are used for full hands and the uniform fallback otherwise.
+    """
+    nc = len(policy.claims)
+    feasible = policy.claim_Q <= total
+    if rows is None and a != policy.num_dice:
+        # uniform over claims with Q <= total dice; own dice independent of the claim
+        pi = feasible / feasible.sum()
+        return pi[:, None] * binomial_pmf(a, 1 / policy.max_face)[None, :]
+    w, counts = hand_tables(a)
+    rows = np.asarray(policy.claim_rows if rows is None else rows, dtype=np.float64)
+    pi = rows * feasible
+    empty = pi.sum(axis=1) == 0
+    pi[empty] = rows[empty]
+    pi /= pi.sum(axis=1, keepdims=True)
+    D = np.zeros((nc, a + 1))
+    np.add.at(D, (np.broadcast_to(np.arange(nc), counts.shape), counts), w[:, None] * pi)
+    return D
+
+
+def round_outcomes(a, b, responder_fn, subgames=None, claim_rows=None):
+    """
+    (P(claimant loses a die), P(responder loses a die)) for one round with
+    a claimant holding `a` dice and a responder holding `b`, claiming with
+    the (a, b) policy of a policy_store.SubgameStore if given, else with
+    `claim_rows` (full hands) in place of the served policy's.
+    """
+    Q = policy.claim_Q
+    F = np.array([int(c.split('_')[2]) for c in policy.claims])
+    rows = None
+    if subgames is not None and (a, b) in subgames.index:
+        rows = subgames.subgame(a, b)[0]
+    elif claim_rows is not None and a == policy.num_dice:
+        rows = claim_rows
+    D = claim_face_counts(a, a + b, rows)                  # [C, ka]
+    kb = np.arange(b + 1)
+    pb = binomial_pmf(b, 1 / policy.max_face)              # [kb]
+    p_call = np.asarray(responder_fn(np.tile(kb, len(Q)), np.repeat(Q, b + 1), np.repeat(F, b + 1),
+                                     np.full(len(Q) * (b + 1), a)), dtype=np.float64).reshape(len(Q), b + 1)
+    lie = np.arange(a + 1)[None, :, None] + kb[None, None, :] < Q[:, None, None]
+    joint = D[:, :, None] * pb[None, None, :]              # [C, ka, kb]
+    claimant = (joint * (1 - p_call)[:, None, :] * lie).sum()
+    responder = (joint * p_call[:, None, :] * ~lie).sum()
+    return claimant, responder
+
+
+def win_probability(responder_fn, start=(5, 5), subgames=None, claim_rows=None):
+    """
+    P(AI wins) from `start` with the AI (P1) claiming first, and the table
+    V[p1Count, p2Count, isP2Turn] of win probabilities from every state.
+    `subgames` and `claim_rows` replace the claim policy as in round_outcomes.
+    """
+    n1, n2 = start
+    idx = lambda p1, p2, t: ((p1 - 1) * n2 + (p2 - 1)) * 2 + t
+    size = 2 * n1 * n2
+    A, r = np.eye(size), np.zeros(size)
+    outcomes = {}
+    for p1 in range(1, n1 + 1):
+        for p2 in range(1, n2 + 1):
+            for t in (0, 1):
+                a, b = (p1, p2) if t == 0 else (p2, p1)
+                if (a, b) not in outcomes:
+                    outcomes[a, b] = round_outcomes(a, b, responder_fn, subgames, claim_rows)
+                claimant, responder = outcomes[a, b]
+                lose1, lose2 = (claimant, responder) if t == 0 else (responder, claimant)
+                s = idx(p1, p2, t)
+                for q1, q2, p in ((p1 - 1, p2, lose1), (p1, p2 - 1, lose2),
+                                  (p1, p2, 1 - lose1 - lose2)):
+                    if q1 == 0:
+                        continue
+                    if q2 == 0:
+                        r[s] += p
+                    else:
+                        A[s, idx(q1, q2, 1 - t)] -= p
+    V = np.linalg.solve(A, r)
+    table = np.zeros((n1 + 1, n2 + 1, 2))
+    table[1:, 1:] = V.reshape(n1, n2, 2)
+    table[1:, 0] = 1.0
+    return float(table[n1, n2, 0]), table
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Exact match win probability by solving the dice-count Markov chain")
+    p.add_argument("--check", type=int, default=0, metavar="N",
+                   help="also simulate N matches with play_matches and report the z-score")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--subgames", help="claim with this per-dice-state policy (subgame_train.py artifact)")
+    args = p.parse_args()
+    if args.check and args.subgames:
+        p.error("--check simulates the single policy; use it without --subgames")
+    subgames = SubgameStore(args.subgames) if args.subgames else None
+    for n in range(1, policy.num_dice + 1):
+        hand_tables(n)
+
+    for name, fn in match_sim.batch_benches.items():
+        t = time.perf_counter()
+        exact, _ = win_probability(fn, subgames=subgames)
+        line = f"AI vs {name:<14}: {exact:.4%} exact  ({1e3 * (time.perf_counter() - t):.1f} ms)"
+        if args.check:
+            t = time.perf_counter()
+            sim = match_sim.play_matches(args.check, fn, np.random.default_rng(args.seed)).mean()
+            z = (sim - exact) / np.sqrt(exact * (1 - exact) / args.check)
+            line += f"   simulated {sim:.4%} over {args.check:,} ({time.perf_counter() - t:.1f} s), z = {z:+.2f}"
+        print(line)
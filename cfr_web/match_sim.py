@@ -1,46 +1,56 @@
 #!/usr/bin/env python3
-import json, random, os
+import random, os, time, argparse
+from itertools import combinations_with_replacement, product
+import numpy as np
+from policy_store import PolicyStore
+from sampling import PolicySampler, BatchClaimSampler
 
 POLICY_PATH = os.path.join(
     os.path.dirname(__file__),
-    "../policies/liarsdice_5die_mccfr_policy.json"
+    "../policies/liarsdice_5die_mccfr_policy.bin"
 )
-with open(POLICY_PATH) as f:
-    policy = json.load(f)
-
-# precompute all possible claims for fallback
-ALL_CLAIMS = [f"claim_{Q}_{F}"
-              for Q in range(1, 2*5+1)
-              for F in range(1, 6+1)]
+policy = PolicyStore(POLICY_PATH)
+sampler = PolicySampler(policy)
 
 def sample_claim(hand, p1Count, p2Count):
-    key = str(tuple(sorted(hand)))
-    base = policy.get(key)
-    total = p1Count + p2Count
-    if base is None:
-        # uniform over feasible if hand‐size differs
-        feasible = [c for c in ALL_CLAIMS if int(c.split('_')[1]) <= total]
-        return random.choice(feasible)
-    # filter out Q>total
-    filt = {a:p for a,p in base.items()
-            if int(a.split('_')[1]) <= total}
-    if not filt:
-        filt = base
-    actions, weights = zip(*filt.items())
-    return random.choices(actions, weights)[0]
-
-# different responder strategies
-def responder_random50(hand, claim):
+    # uniform over feasible claims if the hand size differs from the policy's
+    return sampler.sample_claim(hand, p1Count + p2Count)
+
+# different responder strategies; n is the claimant's dice count
+def responder_random50(hand, claim, n):
     return random.choice(["accept","call"])
 
-def responder_call90(hand, claim):
+def responder_call90(hand, claim, n):
     return "call" if random.random() < 0.9 else "accept"
 
-def responder_threshold(hand, claim, threshold=3):
+def responder_accept(hand, claim, n):
+    # the strongest fixed responder here: under the 4-case table a call can
+    # only cost the responder a die, so accepting weakly dominates it
+    return "accept"
+
+def responder_threshold(hand, claim, n, threshold=3):
     # accept small bids, call large ones
     Q = int(claim.split('_')[1])
     return "call" if Q > threshold else "accept"
 
+_oracle = None
+
+def claim_oracle():
+    # claim-truth probability tables (cfr_files/claim_oracle.py), built on first use
+    global _oracle
+    if _oracle is None:
+        import sys
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../cfr_files"))
+        from claim_oracle import ClaimOracle
+        _oracle = ClaimOracle(policy.num_dice, policy.max_face)
+    return _oracle
+
+def responder_one_turn_br(hand, claim, n):
+    # the one-turn game's best response to an uninformative claim: call when it
+    # is more likely false than true given our own dice. Weaker than
+    # responder_accept in matches, where calling a lie gains nothing
+    return "call" if claim_oracle().prob(hand, n, claim) < 0.5 else "accept"
+
 def play_one_match(responder_fn):
     p1Count, p2Count = 5, 5
     isP1Turn = True
@@ -52,10 +62,10 @@ def play_one_match(responder_fn):
         # claimant and responder
         if isP1Turn:
             claim = sample_claim(r1, p1Count, p2Count)
-            resp  = responder_fn(r2, claim)
+            resp  = responder_fn(r2, claim, p1Count)
         else:
             claim = sample_claim(r2, p1Count, p2Count)
-            resp  = responder_fn(r1, claim)
+            resp  = responder_fn(r1, claim, p2Count)
 
         # evaluate
         Q = int(claim.split('_')[1])
@@ -76,15 +86,153 @@ def play_one_match(responder_fn):
 
     return 1 if p1Count > 0 else 2  # 1=AI wins, 2=opponent wins
 
+benches = {
+  "random50/50":   responder_random50,
+  "call_90%":      responder_call90,
+  "threshold_Q>3": lambda hand,claim,n: responder_threshold(hand,claim,n,3),
+  "threshold_Q>4": lambda hand,claim,n: responder_threshold(hand,claim,n,4),
+  "one_turn_br":   responder_one_turn_br,
+  "always_accept": responder_accept,
+}
+
+###############################################################################
+# Vectorized simulator: many independent matches advanced round by round in
+# lockstep. Batch responders map the number of the responder's dice showing
+# the claimed face, the claims' Q, F and the claimant's dice count n (arrays
+# of equal length) to call probabilities, so the exact evaluator
+# (match_exact.py) can use them too.
+###############################################################################
+
+def batch_responder_random50(k, Q, F, n):
+    return np.full(len(Q), 0.5)
+
+def batch_responder_call90(k, Q, F, n):
+    return np.full(len(Q), 0.9)
+
+def batch_responder_accept(k, Q, F, n):
+    return np.zeros(len(Q))
+
+def batch_responder_threshold(k, Q, F, n, threshold=3):
+    return (Q > threshold).astype(np.float64)
+
+def batch_responder_one_turn_br(k, Q, F, n):
+    return (claim_oracle().probs(k, n, Q) < 0.5).astype(np.float64)
+
+batch_benches = {
+  "random50/50":   batch_responder_random50,
+  "call_90%":      batch_responder_call90,
+  "threshold_Q>3": lambda k,Q,F,n: batch_responder_threshold(k,Q,F,n,3),
+  "threshold_Q>4": lambda k,Q,F,n: batch_responder_threshold(k,Q,F,n,4),
+  "one_turn_br":   batch_responder_one_turn_br,
+  "always_accept": batch_responder_accept,
+}
+
+class HandDealer:
+    """
+    Deals hands of 0..num_dice dice. Every hand is a sorted multiset; the
+    first c dice of a uniform roll of num_dice dice are a uniform roll of
+    c dice, so `deal` draws one roll index per player and looks its hand
+    up in a [dice count, roll] table built once.
+    """
+    def __init__(self, num_dice, max_face, fallback=-1):
+        hands = [h for c in range(num_dice + 1)
+                 for h in combinations_with_replacement(range(1, max_face + 1), c)]
+        index = {h: i for i, h in enumerate(hands)}
+        rolls = list(product(range(1, max_face + 1), repeat=num_dice))
+        self.n_rolls = len(rolls)
+        self.table = np.array([[index[tuple(sorted(r[:c]))] for r in rolls]
+                               for c in range(num_dice + 1)], dtype=np.int32).ravel()
+        # hand * max_face + face - 1 -> dice showing that face
+        self.face_counts = np.array([h.count(f) for h in hands for f in range(1, max_face + 1)],
+                                    dtype=np.int32)
+        # hand -> PolicyStore row for full-size hands (same sorted order), else `fallback`
+        full = len(hands) - index[(1,) * num_dice]
+        self.policy_row = np.full(len(hands), fallback, dtype=np.int32)
+        self.policy_row[-full:] = np.arange(full)
+
+    def deal(self, n_dice, rng):
+        r = rng.integers(0, self.n_rolls, len(n_dice), dtype=np.int32)
+        return self.table[n_dice * self.n_rolls + r]
+
+_batch = None
+
+def batch_tables():
+    # alias tables for every (hand, total dice) and the hand dealer, built on first use
+    global _batch
+    if _batch is None:
+        claims = BatchClaimSampler(policy)
+        _batch = claims, HandDealer(policy.num_dice, policy.max_face, claims.fallback)
+    return _batch
+
+def play_matches(n, responder_fn, rng=None, start=(5, 5), chunk=1 << 16):
+    """
+    Play `n` matches of play_one_match with a batch responder; returns a
+    bool array, True where the AI (P1) won. `rng` is a numpy Generator.
+    Matches are played `chunk` at a time so the working arrays stay in
+    cache.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    return np.concatenate([_play_chunk(min(chunk, n - i), responder_fn, rng, start)
+                           for i in range(0, n, chunk)] or [np.zeros(0, dtype=bool)])
+
+def _play_chunk(n, responder_fn, rng, start):
+    # turns alternate in lockstep, so the state is the claimant's and the
+    # responder's dice counts (swapped after each round); finished matches
+    # are dropped from the working arrays
+    sampler, dealer = batch_tables()
+    claims_Q = policy.claim_Q.astype(np.int32)
+    claims_F = np.array([int(c.split('_')[2]) - 1 for c in policy.claims], dtype=np.int32)
+    max_face = policy.max_face
+    won = np.zeros(n, dtype=bool)
+    ids = np.arange(n, dtype=np.int32)
+    a = np.full(n, start[0], dtype=np.int32)    # claimant's dice (P1 on even rounds)
+    b = np.full(n, start[1], dtype=np.int32)    # responder's dice
+    isP1Turn = True
+    while len(ids):
+        # roll: both players' hands in one deal
+        m = len(ids)
+        hands = dealer.deal(np.concatenate([a, b]), rng)
+        ha, hb = hands[:m], hands[m:]
+
+        # claim and response
+        claim = sampler.sample(dealer.policy_row[ha], a + b, rng)
+        Q, F = claims_Q[claim], claims_F[claim]
+        ka = dealer.face_counts[ha * max_face + F]
+        kb = dealer.face_counts[hb * max_face + F]
+        call = rng.random(m) < responder_fn(kb, Q, F + 1, a)
+
+        # evaluate and punish according to the 4-case table
+        lie = ka + kb < Q
+        a = a - (~call & lie)
+        b = b - (call & ~lie)
+
+        over = (a == 0) | (b == 0)
+        if over.any():
+            won[ids[over]] = (a[over] if isP1Turn else b[over]) > 0
+            alive = ~over
+            ids, a, b = ids[alive], a[alive], b[alive]
+        a, b = b, a
+        isP1Turn = not isP1Turn
+    return won
+
+
 if __name__ == "__main__":
-    N = 10000
-    benches = {
-      "random50/50":   responder_random50,
-      "call_90%":      responder_call90,
-      "threshold_Q>3": lambda hand,claim: responder_threshold(hand,claim,3),
-      "threshold_Q>4": lambda hand,claim: responder_threshold(hand,claim,4),
-    }
-
-    for name, fn in benches.items():
-        wins = sum(1 for _ in range(N) if play_one_match(fn) == 1)
-        print(f"AI vs {name:<12}: {wins/N:.2%} win rate")
+    p = argparse.ArgumentParser(description="AI win rate over full matches against fixed responders")
+    p.add_argument("-n", "--matches", type=int, default=10000)
+    p.add_argument("--scalar", action="store_true", help="play matches one at a time (play_one_match)")
+    p.add_argument("--seed", type=int, default=None)
+    args = p.parse_args()
+    N = args.matches
+    rng = np.random.default_rng(args.seed)
+    random.seed(args.seed)
+    if not args.scalar:
+        batch_tables()    # one-off table build, kept out of the timings
+
+    for name in benches:
+        start = time.perf_counter()
+        if args.scalar:
+            wins = sum(1 for _ in range(N) if play_one_match(benches[name]) == 1)
+        else:
+            wins = int(play_matches(N, batch_benches[name], rng).sum())
+        rate = N / (time.perf_counter() - start)
+        print(f"AI vs {name:<12}: {wins/N:.2%} win rate   ({rate:,.0f} matches/s)")
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Several policies served side by side. A variant (the MCCFR policy, an A/B
+candidate, ...) is an ordered list of artifacts; a request is routed to
+the first artifact of its variant that was trained for its dice state:
+
+    compiled store (.bin)       num_dice vs num_dice (or an unknown opponent)
+    subgames (.npz)             claims with n1 dice vs n2 and responses with
+                                n2 dice vs n1, for each (n1, n2) it holds
+
+If none was, the first store for the AI's hand size serves it off-policy,
+and FALLBACK (uniform feasible claims, 50/50 responses) when there is none.
+Routing only reads artifact headers; the policy a route needs (a whole
+store, or one side of one subgame) is loaded on first use into an LRU of
+resident policies bounded by the bytes of their rows and sampler caches.
+
+    registry = PolicyRegistry({"mccfr": ["a.bin", "subgames.npz"]}, "mccfr", max_bytes=64 << 20)
+    policy = registry.get(registry.route("mccfr", "pl1", len(hand), p2Count))
+    policy.sampler.sample_claim(hand, p1Count + p2Count)
+"""
+import os, time, threading
+from zipfile import BadZipFile
+from collections import OrderedDict
+import numpy as np
+from policy_store import PolicyStore, SubgameStore, SubgamePolicy, read_header, claim_names, RESPONSES
+from sampling import PolicySampler
+
+
+class FallbackPolicy:
+    """Matches no hand, so PolicySampler and the batch helpers fall back for every state."""
+    def __init__(self, num_dice=5, max_face=6):
+        self.path = None
+        self.version = "fallback"
+        self.num_dice = -1
+        self.max_face = max_face
+        self.claims = claim_names(num_dice, max_face)
+        self.responses = RESPONSES
+        self.claim_index = {c: i for i, c in enumerate(self.claims)}
+        self.claim_Q = np.array([int(c.split("_")[1]) for c in self.claims])
+        self.max_Q = 2 * num_dice
+        self.hand_table = self.claim_rows = self.response_rows = None
+
+    def validate(self):
+        pass
+
+    def hand_index(self, hand):
+        return None
+
+    def response_row(self, hand, claim):
+        return None
+
+
+class Resident:
+    """
+    A loaded, validated policy and its sampler; `nbytes` counts its rows,
+    hand table and the sampler's alias-table cache when full.
+    """
+    def __init__(self, store):
+        store.validate()
+        self.store = store
+        self.sampler = PolicySampler(store)
+        self.mtime = os.stat(store.path).st_mtime_ns if store.path else None
+        self.loaded_at = time.time()
+        self.nbytes = sum(a.nbytes for a in (store.hand_table, store.claim_rows, store.response_rows)
+                          if a is not None) + self.sampler.cache_nbytes()
+
+
+FALLBACK = Resident(FallbackPolicy())
+
+
+class PolicyRegistry:
+    """
+    Routes (variant, player, dice) to a policy key and keeps the policies
+    of recently used keys resident, evicting the least recently used once
+    their rows exceed `max_bytes` (the policy just loaded always stays).
+    Loads run outside the lock, so hits never wait for a miss.
+    """
+    def __init__(self, variants, default, max_bytes=64 << 20):
+        if default not in variants:
+            raise ValueError(f"default variant {default!r} is not configured")
+        missing = sorted({p for paths in variants.values() for p in paths if not os.path.isfile(p)})
+        if missing:
+            raise ValueError(f"policy artifacts not found: {', '.join(missing)}")
+        self.variants = {name: list(paths) for name, paths in variants.items()}
+        self.default = default
+        self.max_bytes = max_bytes
+        self._headers = {}                 # path -> (mtime, "store", num_dice) or (mtime, "subgames", SubgameStore)
+        self._resident = OrderedDict()     # key -> Resident, least recently used first
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.reloads = 0
+        self.load_seconds = 0.0
+
+    @staticmethod
+    def _read_header(path):
+        mtime = os.stat(path).st_mtime_ns
+        if path.endswith(".npz"):
+            return (mtime, "subgames", SubgameStore(path))
+        return (mtime, "store", read_header(path)["num_dice"])
+
+    def _header(self, path):
+        h = self._headers.get(path)
+        if h is None:
+            h = self._read_header(path)
+            with self._lock:
+                h = self._headers.setdefault(path, h)
+        return h
+
+    def route(self, variant, player, dice, opp_dice=None):
+        """
+        Key of the policy for `player` ("pl1" claims, "pl2" responds) holding
+        `dice` dice against `opp_dice`, or None for FALLBACK. Raises KeyError
+        for an unknown variant.
+        """
+        approx = None
+        for path in self.variants[variant or self.default]:
+            _, kind, h = self._header(path)
+            if kind == "store":
+                if dice == h and opp_dice in (None, h):
+                    return (path,)
+                if dice == h and approx is None:
+                    approx = (path,)
+            elif opp_dice is not None:
+                state = (dice, opp_dice) if player == "pl1" else (opp_dice, dice)
+                if state in h.index:
+                    return (path, "claim" if player == "pl1" else "respond") + state
+        return approx
+
+    def get(self, key):
+        """The Resident policy of a routed key, loading it on a miss."""
+        if key is None:
+            return FALLBACK
+        with self._lock:
+            r = self._resident.get(key)
+            if r is not None:
+                self._resident.move_to_end(key)
+                self.hits += 1
+                return r
+            self.misses += 1
+        r = self._load(key)
+        with self._lock:
+            # a concurrent miss on the same key may have won the race; keep its copy
+            r = self._resident.setdefault(key, r)
+            self._resident.move_to_end(key)
+            self._evict()
+        return r
+
+    def _load(self, key):
+        t = time.perf_counter()
+        path = key[0]
+        if len(key) == 1:
+            r = Resident(PolicyStore(path))
+        else:
+            _, role, n1, n2 = key
+            r = Resident(SubgamePolicy(self._header(path)[2], n1, n2, role))
+        with self._lock:
+            self.load_seconds += time.perf_counter() - t
+        return r
+
+    def _evict(self):
+        total = sum(r.nbytes for r in self._resident.values())
+        while total > self.max_bytes and len(self._resident) > 1:
+            _, r = self._resident.popitem(last=False)
+            total -= r.nbytes
+            self.evictions += 1
+
+    def refresh(self):
+        """
+        Reload resident policies whose artifact changed on disk (same
+        version: only the mtime is updated). A changed artifact is loaded and
+        validated before it replaces the resident copy, so a bad file keeps
+        the old policy serving; the error is raised after the others are
+        checked. Returns True if any policy was replaced.
+        """
+        swapped, error = False, None
+        # re-read changed headers, so routes follow the new artifacts (or keep
+        # the old ones); the cached header stays until its replacement is built
+        with self._lock:
+            headers = list(self._headers.items())
+        for path, h in headers:
+            try:
+                if os.stat(path).st_mtime_ns != h[0]:
+                    new = self._read_header(path)
+                    with self._lock:
+                        self._headers[path] = new
+            except (OSError, ValueError, KeyError, BadZipFile) as e:
+                error = error or e
+        with self._lock:
+            resident = list(self._resident.items())
+        for key, r in resident:
+            try:
+                if os.stat(key[0]).st_mtime_ns == r.mtime:
+                    continue
+                candidate = self._load(key)
+            except (OSError, ValueError, KeyError, BadZipFile) as e:
+                error = error or e
+                continue
+            if candidate.store.version == r.store.version:
+                r.mtime = candidate.mtime
+                continue
+            with self._lock:
+                if key in self._resident:
+                    self._resident[key] = candidate
+                    self.reloads += 1
+                    swapped = True
+        if error is not None:
+            raise ValueError(f"policy reload failed: {error}")
+        return swapped
+
+    def metrics(self):
+        with self._lock:
+            resident = [{"key": "/".join(map(str, key)), "version": r.store.version,
+                         "bytes": r.nbytes, "loaded_at": r.loaded_at}
+                        for key, r in self._resident.items()]
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "reloads": self.reloads,
+                "hit_rate": self.hits / lookups if lookups else None,
+                "load_seconds": self.load_seconds,
+                "resident_bytes": sum(p["bytes"] for p in resident),
+                "max_bytes": self.max_bytes,
+                "variants": self.variants, "default": self.default,
+                "resident": resident,
+            }
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+import ast, sys, json, os, mmap, argparse, hashlib, threading
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "../cfr_files"))
+from hands import sorted_hands
+
+# Binary policy store layout (little-endian):
+#   8 bytes   MAGIC
+#   uint32    length of the json header
+#   header    {"num_dice", "max_face", "num_hands", "claims", "responses"}, padded to 16 bytes
+#   int32     hand table     [max_face**num_dice]         (ordered roll -> hand row)
+#   float32   claim rows     [num_hands, num_claims]      (P1: hand -> claim)
+#   float32   response rows  [num_hands, num_claims, 2]   (P2: hand, claim -> accept/call)
+# Hands are sorted multisets in combinations_with_replacement order. Every
+# row is normalized; hands/claims missing from the source policy get the
+# fallbacks app.py used to apply (uniform claims, 50/50 responses).
+#
+# Compressed (sparse) layout, written by compress_policy:
+#   8 bytes   SPARSE_MAGIC
+#   uint32    length of the json header
+#   header    as above plus "bits", "threshold", "response_default", the
+#             dtypes and entry counts of the sections below, padded to 16 bytes
+#   index     claim entries per hand      [num_hands]
+#   index     claim column of each entry  [claim_nnz]
+#   value     claim probability * scale   [claim_nnz]       (each hand sums to scale)
+#   pos       hand * num_claims + claim   [response_nnz]
+#   value     P(accept) * scale           [response_nnz]    (others: response_default)
+# with scale = 2**bits - 1. The hand table is rebuilt on load; rows are
+# decoded into dense float32 arrays, so readers see the same attributes.
+
+MAGIC = b"LDPOL\x00\x01\x00"
+SPARSE_MAGIC = b"LDPOL\x00\x02\x00"
+RESPONSES = ["accept", "call"]
+
+
+def claim_names(num_dice, max_face):
+    return [f"claim_{Q}_{F}"
+            for Q in range(1, 2*num_dice+1)
+            for F in range(1, max_face+1)]
+
+
+class PolicyStore:
+    """
+    Memory-mapped view of a compiled policy. Workers opening the same file
+    share its pages through the OS page cache.
+    """
+    def __init__(self, path):
+        # one mapping serves the header, the version hash and the rows, so a
+        # rename replacing `path` mid-load cannot mix two artifacts
+        with open(path, "rb") as f:
+            raw = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if raw[:len(MAGIC)] not in (MAGIC, SPARSE_MAGIC):
+            raise ValueError(f"{path} is not a compiled policy store")
+        n = int.from_bytes(raw[len(MAGIC):len(MAGIC) + 4], "little")
+        header = json.loads(raw[len(MAGIC) + 4:len(MAGIC) + 4 + n])
+        offset = _data_offset(n)
+        self.path = path
+        self.header = header
+        # content hash, reported as the policy version
+        self.version = hashlib.sha256(raw).hexdigest()[:16]
+        self.num_dice = header["num_dice"]
+        self.max_face = header["max_face"]
+        self.claims = header["claims"]
+        self.responses = header["responses"]
+        self.claim_index = {c: i for i, c in enumerate(self.claims)}
+        # Q of each claim, for the Q <= total dice filter
+        self.claim_Q = np.array([int(c.split("_")[1]) for c in self.claims])
+        # most dice in play: both players hold num_dice
+        self.max_Q = 2 * self.num_dice
+
+        # any ordered roll -> hand row: base-max_face digits index a dense table
+        self.num_hands = header["num_hands"]
+        self.powers = [self.max_face**i for i in range(self.num_dice)]
+        n_rolls = self.max_face**self.num_dice
+        if raw[:len(MAGIC)] == SPARSE_MAGIC:
+            self.hand_table = _hand_table(self.num_dice, self.max_face)
+            self.claim_rows, self.response_rows = _decode_sparse(header, raw, offset)
+            return
+        self.hand_table = np.frombuffer(raw, dtype="<i4", count=n_rolls, offset=offset)
+
+        nc = len(self.claims)
+        data = np.frombuffer(raw, dtype="<f4", count=self.num_hands * nc * 3,
+                             offset=offset + 4 * n_rolls)
+        self.claim_rows = data[:self.num_hands * nc].reshape(self.num_hands, nc)
+        self.response_rows = data[self.num_hands * nc:].reshape(self.num_hands, nc, 2)
+
+    def validate(self):
+        """Raise ValueError unless every row is a finite probability distribution."""
+        if self.hand_table.min() < 0 or self.hand_table.max() >= self.num_hands:
+            raise ValueError(f"{self.path}: hand table out of range")
+        for name, rows in (("claim", self.claim_rows), ("response", self.response_rows)):
+            if not np.isfinite(rows).all() or (rows < 0).any():
+                raise ValueError(f"{self.path}: {name} rows contain invalid probabilities")
+            if not np.allclose(rows.sum(axis=-1), 1.0, atol=1e-4):
+                raise ValueError(f"{self.path}: {name} rows are not normalized")
+
+    def hand_index(self, hand):
+        # None for hands of another size or with faces outside 1..max_face
+        if len(hand) != self.num_dice or not all(1 <= d <= self.max_face for d in hand):
+            return None
+        key = 0
+        for d, p in zip(hand, self.powers):
+            key += (d - 1) * p
+        return int(self.hand_table[key])
+
+    def hand_indices(self, hands):
+        # vectorized hand_index for an array of equal-length hands; ValueError for bad faces
+        faces = np.asarray(hands, dtype=np.int64)
+        if ((faces < 1) | (faces > self.max_face)).any():
+            raise ValueError(f"hand faces must be in 1..{self.max_face}")
+        keys = (faces - 1) @ np.array(self.powers)
+        return self.hand_table[keys]
+
+    def claim_row(self, hand):
+        h = self.hand_index(hand)
+        return None if h is None else self.claim_rows[h]
+
+    def response_row(self, hand, claim):
+        h = self.hand_index(hand)
+        c = self.claim_index.get(claim)
+        return None if h is None or c is None else self.response_rows[h, c]
+
+
+class SubgameStore:
+    """
+    Reader for the multi-subgame artifact of cfr_files/subgame_train.py: a
+    one-turn policy for every (claimant dice, responder dice) state. Only
+    the index is read up front; each subgame's rows are loaded on first use.
+    """
+    def __init__(self, path):
+        # hash and index the same open file, so a rename replacing `path`
+        # cannot pair one artifact's version with another's rows
+        f = open(path, "rb")
+        digest = hashlib.sha256()
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+        self.version = digest.hexdigest()[:16]
+        f.seek(0)
+        self.path = path
+        self._npz = np.load(f)
+        header = json.loads(str(self._npz["index"]))
+        self.max_dice = header["max_dice"]
+        self.max_face = header["max_face"]
+        self.claims = header["claims"]
+        self.responses = RESPONSES
+        self.claim_index = {c: i for i, c in enumerate(self.claims)}
+        self.claim_Q = np.array([int(c.split("_")[1]) for c in self.claims])
+        self.index = {(s["n1"], s["n2"]): s for s in header["subgames"]}
+        self._rows = {}
+        self._hands = {}
+        self._lock = threading.Lock()
+
+    def subgame(self, n1, n2):
+        """(claim rows [hands of n1 dice, claims], P(accept) [hands of n2 dice, claims])"""
+        rows = self._rows.get((n1, n2))
+        if rows is None:
+            rows = self._rows[n1, n2] = self.read(n1, n2)
+        return rows
+
+    def read(self, n1, n2):
+        # subgame() without keeping the rows, for callers that manage their own cache
+        if (n1, n2) not in self.index:
+            raise KeyError(f"{self.path} has no {n1}x{n2} subgame")
+        with self._lock:
+            return self._npz[f"claims_{n1}x{n2}"], self._npz[f"accept_{n1}x{n2}"]
+
+    def hand_index(self, hand):
+        n = len(hand)
+        if n not in self._hands:
+            self._hands[n] = {h: i for i, h in enumerate(_sorted_hands(n, self.max_face))}
+        return self._hands[n].get(tuple(sorted(hand)))
+
+    def claim_row(self, hand, opp_dice):
+        # claimant holding `hand` against `opp_dice` dice; None outside the trained states
+        h = self.hand_index(hand)
+        if (len(hand), opp_dice) not in self.index or h is None:
+            return None
+        return self.subgame(len(hand), opp_dice)[0][h]
+
+    def response_row(self, hand, claim, opp_dice):
+        # [accept, call] for a responder holding `hand` against a claimant with `opp_dice` dice
+        c, h = self.claim_index.get(claim), self.hand_index(hand)
+        if (opp_dice, len(hand)) not in self.index or c is None or h is None:
+            return None
+        p = float(self.subgame(opp_dice, len(hand))[1][h, c])
+        return np.array([p, 1.0 - p])
+
+
+class SubgamePolicy(PolicyStore):
+    """
+    PolicyStore-shaped view of one side of a SubgameStore subgame, so that
+    PolicySampler and the batch helpers in sampling.py serve it unchanged:
+    role "claim" holds the claimant's rows for hands of n1 dice, role
+    "respond" the responder's [accept, call] rows for hands of n2 dice.
+    The rows of the other role are None.
+    """
+    def __init__(self, subgames, n1, n2, role):
+        claims, accept = subgames.read(n1, n2)
+        self.path = subgames.path
+        self.version = subgames.version
+        self.num_dice = n1 if role == "claim" else n2
+        self.max_face = subgames.max_face
+        self.claims = subgames.claims
+        self.responses = subgames.responses
+        self.claim_index = subgames.claim_index
+        self.claim_Q = subgames.claim_Q
+        self.max_Q = n1 + n2
+        self.num_hands = len(claims if role == "claim" else accept)
+        self.powers = [self.max_face**i for i in range(self.num_dice)]
+        self.hand_table = _hand_table(self.num_dice, self.max_face)
+        self.claim_rows = np.asarray(claims) if role == "claim" else None
+        self.response_rows = (np.stack([accept, 1 - accept], axis=-1) if role == "respond" else None)
+
+    def validate(self):
+        for rows in (self.claim_rows, self.response_rows):
+            if rows is not None and (not np.isfinite(rows).all() or (rows < 0).any()):
+                raise ValueError(f"{self.path}: subgame rows contain invalid probabilities")
+
+
+def read_header(path):
+    """The json header of a compiled policy store, without reading its rows."""
+    with open(path, "rb") as f:
+        magic, n = f.read(len(MAGIC)), int.from_bytes(f.read(4), "little")
+        if magic not in (MAGIC, SPARSE_MAGIC):
+            raise ValueError(f"{path} is not a compiled policy store")
+        return json.loads(f.read(n))
+
+
+def _data_offset(header_len):
+    return -(-(len(MAGIC) + 4 + header_len) // 16) * 16
+
+def _sorted_hands(num_dice, max_face):
+    return sorted_hands(num_dice, max_face)[0]
+
+def _hand_table(num_dice, max_face):
+    # every ordered roll (digit i = die i - 1) -> row of its sorted hand
+    powers = max_face ** np.arange(num_dice)
+    rolls = np.indices((max_face,) * num_dice).reshape(num_dice, -1).T
+    hand_keys = (np.array(_sorted_hands(num_dice, max_face)) - 1) @ powers
+    order = np.argsort(hand_keys)
+    table = np.empty(max_face**num_dice, dtype=np.int32)
+    table[rolls @ powers] = order[np.searchsorted(hand_keys[order], np.sort(rolls, axis=1) @ powers)]
+    return table
+
+def _normalized(row, fallback):
+    total = row.sum()
+    return row / total if total > 0 else fallback
+
+
+def policy_rows(json_path, num_dice=5, max_face=6):
+    """
+    Dense (claim_rows [hands, claims], response_rows [hands, claims, 2])
+    of an mccfr_train.py policy json (keys str(hand) and str((hand, claim))).
+    """
+    with open(json_path) as f:
+        policy = json.load(f)
+    hands = _sorted_hands(num_dice, max_face)
+    claims = claim_names(num_dice, max_face)
+    nc = len(claims)
+    claim_rows = np.full((len(hands), nc), 1.0 / nc)
+    response_rows = np.full((len(hands), nc, 2), 0.5)
+    hand_idx = {h: i for i, h in enumerate(hands)}
+    claim_idx = {c: i for i, c in enumerate(claims)}
+
+    for key, dist in policy.items():
+        k = ast.literal_eval(key)
+        if isinstance(k[0], tuple):
+            hand, claim = k
+            row = np.array([dist.get(r, 0.0) for r in RESPONSES])
+            response_rows[hand_idx[hand], claim_idx[claim]] = _normalized(row, 0.5)
+        else:
+            row = np.array([dist.get(c, 0.0) for c in claims])
+            claim_rows[hand_idx[k]] = _normalized(row, 1.0 / nc)
+    return claim_rows, response_rows
+
+
+def _header(num_dice, max_face, **extra):
+    return {
+        "num_dice": num_dice,
+        "max_face": max_face,
+        "num_hands": len(_sorted_hands(num_dice, max_face)),
+        "claims": claim_names(num_dice, max_face),
+        "responses": RESPONSES,
+        **extra,
+    }
+
+def _write(out_path, magic, header, sections):
+    # write next to the target and rename, so readers never see a partial file
+    header = json.dumps(header).encode()
+    tmp_path = out_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(magic)
+        f.write(len(header).to_bytes(4, "little"))
+        f.write(header)
+        f.write(b"\0" * (_data_offset(len(header)) - f.tell()))
+        for a in sections:
+            a.tofile(f)
+    os.replace(tmp_path, out_path)
+
+
+def compile_policy(json_path, out_path, num_dice=5, max_face=6):
+    """
+    Convert an mccfr_train.py policy json (keys str(hand) and
+    str((hand, claim))) into a binary policy store.
+    """
+    claim_rows, response_rows = policy_rows(json_path, num_dice, max_face)
+    _write(out_path, MAGIC, _header(num_dice, max_face), [
+        _hand_table(num_dice, max_face).astype("<i4"),
+        claim_rows.astype("<f4"),
+        response_rows.astype("<f4"),
+    ])
+
+
+def prune_claims(rows, threshold):
+    # zero claim probabilities below `threshold` (keeping each hand's best) and renormalize
+    rows = np.asarray(rows, dtype=np.float64)
+    kept = np.where(rows >= threshold, rows, 0.0)
+    empty = ~kept.any(axis=1)
+    kept[empty, rows[empty].argmax(axis=1)] = 1.0
+    return kept / kept.sum(axis=1, keepdims=True)
+
+def quantize_rows(rows, scale):
+    """Integer rows summing to `scale` (largest remainder) closest to `rows` * scale."""
+    x = rows * scale
+    q = np.floor(x).astype(np.int64)
+    short = scale - q.sum(axis=1, keepdims=True)
+    rank = np.argsort(np.argsort(q - x, axis=1, kind="stable"), axis=1)
+    return q + (rank < short)
+
+
+def compress_policy(claim_rows, response_rows, out_path, threshold=1e-3, bits=8,
+                    num_dice=5, max_face=6, meta=None):
+    """
+    Write a sparse fixed-point policy store: claim probabilities below
+    `threshold` are dropped and the rest renormalized, P(accept) within
+    `threshold` of 0 or 1 is rounded to it, and everything is quantized to
+    `bits` bits. Responses equal to the most common value (the 50/50
+    fallback of unvisited infosets) are left out.
+    """
+    if not 1 <= bits <= 16:
+        raise ValueError("bits must be in 1..16")
+    scale = 2**bits - 1
+    value_dtype = "<u1" if bits <= 8 else "<u2"
+    nh, nc = np.shape(claim_rows)
+    q = quantize_rows(prune_claims(claim_rows, threshold), scale)
+    hands, cols = np.nonzero(q)
+    index_dtype = "<u1" if nc <= 256 else "<u2"
+
+    accept = np.asarray(response_rows, dtype=np.float64)[..., 0].ravel()
+    accept = np.where(accept < threshold, 0.0, np.where(accept > 1 - threshold, 1.0, accept))
+    values, counts = np.unique(accept, return_counts=True)
+    default = float(values[counts.argmax()])
+    pos = np.flatnonzero(accept != default)
+    pos_dtype = "<u2" if nh * nc <= 1 << 16 else "<u4"
+
+    header = _header(num_dice, max_face, bits=bits, threshold=threshold, response_default=default,
+                     index_dtype=index_dtype, value_dtype=value_dtype, pos_dtype=pos_dtype,
+                     claim_nnz=len(cols), response_nnz=len(pos), **(meta or {}))
+    _write(out_path, SPARSE_MAGIC, header, [
+        np.bincount(hands, minlength=nh).astype(index_dtype),
+        cols.astype(index_dtype),
+        q[hands, cols].astype(value_dtype),
+        pos.astype(pos_dtype),
+        np.rint(accept[pos] * scale).astype(value_dtype),
+    ])
+
+
+def _decode_sparse(header, raw, offset):
+    # dense float32 (claim_rows, response_rows) of a compress_policy store
+    nh, nc = header["num_hands"], len(header["claims"])
+    scale = np.float32(2**header["bits"] - 1)
+    sections = []
+    for dtype, count in ((header["index_dtype"], nh), (header["index_dtype"], header["claim_nnz"]),
+                         (header["value_dtype"], header["claim_nnz"]),
+                         (header["pos_dtype"], header["response_nnz"]),
+                         (header["value_dtype"], header["response_nnz"])):
+        a = np.frombuffer(raw, dtype=dtype, count=count, offset=offset)
+        sections.append(a)
+        offset += a.nbytes
+    counts, cols, values, pos, accept_values = sections
+    claim_rows = np.zeros((nh, nc), dtype=np.float32)
+    claim_rows[np.repeat(np.arange(nh), counts), cols] = values / scale
+    accept = np.full(nh * nc, header["response_default"], dtype=np.float32)
+    accept[pos] = accept_values / scale
+    response_rows = np.stack([accept, 1 - accept], axis=-1).reshape(nh, nc, 2)
+    return claim_rows, response_rows
+
+
+if __name__ == "__main__":
+    p = argparse.ArgumentParser(description="Compile a policy json into a binary policy store")
+    p.add_argument("--policy", required=True, help="policy json from mccfr_train.py")
+    p.add_argument("--out", required=True, help="where to write the binary store")
+    p.add_argument("--num-dice", type=int, default=5)
+    p.add_argument("--max-face", type=int, default=6)
+    p.add_argument("--bits", type=int, default=None,
+                   help="write the sparse fixed-point store with this many bits per probability")
+    p.add_argument("--threshold", type=float, default=1e-3,
+                   help="with --bits: drop claim probabilities below this (see compress_report.py)")
+    args = p.parse_args()
+    if args.bits:
+        claim_rows, response_rows = policy_rows(args.policy, args.num_dice, args.max_face)
+        compress_policy(claim_rows, response_rows, args.out, args.threshold, args.bits,
+                        args.num_dice, args.max_face)
+    else:
+        compile_policy(args.policy, args.out, args.num_dice, args.max_face)
+    print(f"Wrote {os.path.getsize(args.out)} bytes to {args.out}")
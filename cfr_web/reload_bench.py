@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Measure policy hot-reload latency while client threads hammer /action.
+Two variants of the policy artifact are swapped into place (atomic rename)
+and reload_policy() is timed; every request is checked for success.
+"""
+import os, sys, json, time, random, shutil, tempfile, argparse, threading
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def percentile(xs, q):
+    xs = sorted(xs)
+    return xs[min(int(q * len(xs)), len(xs) - 1)] if xs else float("nan")
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument("--policy", default=os.path.join(HERE, "../policies/liarsdice_5die_mccfr_policy.json"))
+    p.add_argument("--threads", type=int, default=8)
+    p.add_argument("--reloads", type=int, default=20)
+    args = p.parse_args()
+
+    from policy_store import compile_policy
+    tmp = tempfile.mkdtemp()
+    live = os.path.join(tmp, "live.bin")
+    variants = [os.path.join(tmp, "a.bin"), os.path.join(tmp, "b.bin")]
+    compile_policy(args.policy, variants[0])
+    # second variant: same policy with a perturbed P1 row, so the hash differs
+    with open(args.policy) as f:
+        pol = json.load(f)
+    first = next(iter(pol))
+    pol[first] = {a: random.random() for a in pol[first]}
+    with open(os.path.join(tmp, "b.json"), "w") as f:
+        json.dump(pol, f)
+    compile_policy(os.path.join(tmp, "b.json"), variants[1])
+    shutil.copy(variants[0], live)
+
+    os.environ["POLICY_PATH"] = live
+    os.environ["POLICY_WATCH_INTERVAL"] = "0"
+    sys.path.insert(0, HERE)
+    import app as server
+
+    stop = threading.Event()
+    latencies, errors, versions = [], [0], set()
+
+    def client():
+        c = server.app.test_client()
+        while not stop.is_set():
+            hand = [random.randint(1, 6) for _ in range(5)]
+            t = time.perf_counter()
+            r = c.post("/action", json={"player": "pl1", "hand": hand, "p1Count": 5, "p2Count": 5})
+            latencies.append(time.perf_counter() - t)
+            if r.status_code != 200:
+                errors[0] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(args.threads)]
+    for t in threads:
+        t.start()
+
+    reload_times = []
+    for i in range(args.reloads):
+        time.sleep(0.1)
+        shutil.copy(variants[(i + 1) % 2], live + ".new")
+        os.replace(live + ".new", live)
+        t = time.perf_counter()
+        assert server.reload_policy()
+        reload_times.append(time.perf_counter() - t)
+        versions.add(server.primary().store.version)
+    stop.set()
+    for t in threads:
+        t.join()
+    shutil.rmtree(tmp)
+
+    ms = lambda x: f"{1e3 * x:.2f} ms"
+    print(f"{args.threads} client threads, {len(latencies)} requests, {errors[0]} errors, "
+          f"{len(versions)} policy versions served")
+    print(f"reload latency  p50 {ms(percentile(reload_times, .5))}  max {ms(max(reload_times))}")
+    print(f"request latency p50 {ms(percentile(latencies, .5))}  p99 {ms(percentile(latencies, .99))}")
+
+
+if __name__ == "__main__":
+    main()
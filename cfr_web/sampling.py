@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import sys, random
+from functools import lru_cache
+import numpy as np
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table: O(n) to build, O(1) per sample.
+    """
+    def __init__(self, weights):
+        n = len(weights)
+        total = sum(weights)
+        scaled = [w * n / total for w in weights]
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] += scaled[s] - 1.0
+            (small if scaled[l] < 1.0 else large).append(l)
+        self.n = n
+
+    @staticmethod
+    def nbytes(n):
+        # prob and alias lists of n entries, plus a float object per prob entry
+        return 2 * sys.getsizeof([0] * n) + n * sys.getsizeof(1.0)
+
+    def sample(self, rng=random):
+        i = int(rng.random() * self.n)
+        return i if rng.random() < self.prob[i] else self.alias[i]
+
+
+class PolicySampler:
+    """
+    O(1) action sampling from a PolicyStore. Claims are ordered Q-major, so
+    the claims feasible with `total_dice` dice are a prefix of each row; one
+    alias table per (hand, total_dice) is built on first use and kept in an
+    LRU cache of at most `cache_size` tables.
+    """
+    def __init__(self, store, cache_size=8192):
+        self.store = store
+        self.claims = store.claims
+        self.responses = store.responses
+        self.max_Q = store.max_Q
+        # totals are clamped to 0..max_Q, so no more tables than that can be built
+        hands = 0 if store.claim_rows is None else len(store.claim_rows)
+        self.cache_size = min(cache_size, hands * (self.max_Q + 1))
+        self._table = lru_cache(maxsize=self.cache_size)(self._build)
+
+    def _build(self, hand_idx, total_dice):
+        row = self.store.claim_rows[hand_idx]
+        k = total_dice * self.store.max_face
+        weights = row[:k].tolist()
+        if not any(weights):
+            # nothing feasible (or all mass on infeasible claims): full row
+            weights = row.tolist()
+        return AliasTable(weights)
+
+    def sample_claim(self, hand, total_dice, rng=random):
+        h = self.store.hand_index(hand)
+        if h is None:
+            # uniform over feasible claims for hand sizes the policy lacks
+            k = min(total_dice, self.max_Q) * self.store.max_face if total_dice > 0 else len(self.claims)
+            return self.claims[int(rng.random() * k)]
+        return self.claims[self._table(h, min(max(total_dice, 0), self.max_Q)).sample(rng)]
+
+    def sample_response(self, hand, claim, rng=random):
+        row = self.store.response_row(hand, claim)
+        p_accept = 0.5 if row is None else float(row[0])
+        return self.responses[0] if rng.random() < p_accept else self.responses[1]
+
+    def cache_info(self):
+        return self._table.cache_info()
+
+    def cache_nbytes(self):
+        # upper bound on the alias tables the full cache holds
+        return self.cache_size * AliasTable.nbytes(len(self.claims))
+
+
+class BatchClaimSampler:
+    """
+    Array form of PolicySampler.sample_claim for whole batches of claimants:
+    the alias tables of every (hand, total_dice) pair, padded to the full
+    claim row (infeasible claims get zero weight), are built up front so a
+    batch is sampled with a few gathers. Row `store.num_hands` is the
+    uniform-over-feasible-claims fallback for hands the policy lacks.
+    """
+    def __init__(self, store):
+        self.store = store
+        self.max_Q = store.max_Q
+        self.fallback = store.num_hands
+        nc = len(store.claims)
+        shape = (store.num_hands + 1, self.max_Q + 1, nc)
+        self.prob = np.ones(shape)
+        self.alias = np.broadcast_to(np.arange(nc, dtype=np.int32), shape).copy()
+        for h in range(store.num_hands + 1):
+            for total in range(self.max_Q + 1):
+                row = store.claim_rows[h].astype(np.float64) if h < store.num_hands else np.ones(nc)
+                weights = np.where(np.arange(nc) < total * store.max_face, row, 0.0)
+                if not weights.any():
+                    weights = row
+                t = AliasTable(weights.tolist())
+                self.prob[h, total] = t.prob
+                self.alias[h, total] = t.alias
+        self.prob, self.alias = self.prob.ravel(), self.alias.ravel()
+
+    def sample(self, hand_idx, totals, rng):
+        """
+        Claim indices for claimants holding store hand rows `hand_idx`
+        (self.fallback for other hand sizes) with `totals` dice in play.
+        """
+        nc = len(self.store.claims)
+        # one uniform per claimant: integer part picks the slot, fraction the alias coin
+        x = rng.random(len(hand_idx)) * nc
+        slot = x.astype(np.int32)
+        flat = (hand_idx * (self.max_Q + 1) + np.minimum(totals, self.max_Q)) * nc + slot
+        return np.where(x - slot < self.prob[flat], slot, self.alias[flat])
+
+
+# Batched counterparts used by /action/batch: whole arrays of states at once
+
+def batch_claim_distributions(store, hands, totals):
+    """
+    [B, num_claims] claim distributions, filtered to Q <= total dice and
+    normalized; hands of the wrong size get the uniform fallback.
+    """
+    rows = np.ones((len(hands), len(store.claims)))
+    known = [i for i, h in enumerate(hands) if len(h) == store.num_dice]
+    if known:
+        rows[known] = store.claim_rows[store.hand_indices([hands[i] for i in known])]
+    filt = rows * (store.claim_Q <= np.asarray(totals)[:, None])
+    empty = ~filt.any(axis=1)
+    filt[empty] = rows[empty]
+    return filt / filt.sum(axis=1, keepdims=True)
+
+def batch_response_distributions(store, hands, claims):
+    # [B, 2] accept/call distributions, 50/50 where the policy has no row
+    out = np.full((len(hands), 2), 0.5)
+    known = [i for i, (h, c) in enumerate(zip(hands, claims))
+             if len(h) == store.num_dice and c in store.claim_index]
+    if known:
+        h_idx = store.hand_indices([hands[i] for i in known])
+        c_idx = [store.claim_index[claims[i]] for i in known]
+        out[known] = store.response_rows[h_idx, c_idx]
+    return out
+
+def sample_rows(dists, rng=np.random):
+    # one inverse-CDF draw per row
+    cum = dists.cumsum(axis=1)
+    u = rng.random(len(dists))[:, None] * cum[:, -1:]
+    return np.minimum((cum <= u).sum(axis=1), dists.shape[1] - 1)